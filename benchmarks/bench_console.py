@@ -0,0 +1,322 @@
+"""
+Measure MyBreakPoint hot paths: construction, XStream.write throughput, keypress latency with a
+large scrollback, readline wake-up to command execution under pdb and variable inspector population
+with a huge frame, and tab completion in a module with many globals.
+
+Usage:
+    python benchmarks/bench_console.py
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5 import QtCore, QtGui, QtWidgets  # noqa: E402
+
+from helpus.completion import Completer  # noqa: E402
+from helpus.core import MyBreakPoint, XStream  # noqa: E402
+from helpus.debugger import set_trace  # noqa: E402
+
+
+_APPLICATION = []
+
+
+def get_application():
+    # Keep a reference, QApplication deletes every QObject when garbage collected
+    if not _APPLICATION:
+        _APPLICATION.append(QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv))
+    return _APPLICATION[0]
+
+
+def restore_streams():
+    # Drop XStream singletons, next redirect_outerr_stream installs new ones
+    sys.stdout = sys.__stdout__
+    sys.stderr = sys.__stderr__
+    for stream in (XStream._stdout, XStream._stderr):
+        if stream is not None:
+            stream.flush()
+            stream.deleteLater()
+    XStream._stdout = None
+    XStream._stderr = None
+
+
+def measure_construction(runs=20):
+    """
+    :param runs:
+    :return: seconds per MyBreakPoint
+    """
+    app = get_application()
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        dialog = MyBreakPoint(history_file=None)
+        timings.append(time.perf_counter() - start)
+        dialog.close()
+        dialog.deleteLater()
+        app.processEvents()
+    return statistics.median(timings)
+
+
+def measure_write(lines=20000, buffered=False):
+    """
+    :param lines: lines written through XStream
+    :param buffered:
+    :return: lines per second, including console insertion
+    """
+    app = get_application()
+    dialog = MyBreakPoint(history_file=None)
+    dialog.redirect_outerr_stream(buffered=buffered)
+    stream = XStream.stdout()
+    try:
+        start = time.perf_counter()
+        for index in range(lines):
+            stream.write('line {}\n'.format(index))
+        stream.flush()
+        app.processEvents()
+        elapsed = time.perf_counter() - start
+    finally:
+        restore_streams()
+        dialog.close()
+    return lines / elapsed
+
+
+def measure_keypress(scrollback=50000, keys=200):
+    """
+    :param scrollback: lines in console before typing
+    :param keys: keys typed at the prompt
+    :return: median seconds per keypress
+    """
+    get_application()
+    dialog = MyBreakPoint(max_scrollback=0, history_file=None)
+    dialog.console.setEnabled(True)
+    dialog.console.insertPlainText(''.join('output line {}\n'.format(index) for index in range(scrollback)))
+    dialog.console.insertPlainText(MyBreakPoint.HOOK_HEADER)
+
+    timings = []
+    for index in range(keys):
+        if index % 10 == 9:
+            event = QtGui.QKeyEvent(QtCore.QEvent.Type.KeyPress, QtCore.Qt.Key.Key_Backspace,
+                                    QtCore.Qt.KeyboardModifier.NoModifier)
+        else:
+            event = QtGui.QKeyEvent(QtCore.QEvent.Type.KeyPress, QtCore.Qt.Key.Key_A,
+                                    QtCore.Qt.KeyboardModifier.NoModifier, 'a')
+        start = time.perf_counter()
+        dialog.console.keyPressEvent(event)
+        timings.append(time.perf_counter() - start)
+    dialog.close()
+    return statistics.median(timings)
+
+
+def measure_readline(commands=50):
+    """
+    Type commands into the console while pdb waits in readline, each command records when it runs
+    :param commands:
+    :return: dict with median readline wake-up latency and submit -> command latency
+    """
+    app = get_application()
+    dialog = MyBreakPoint(history_file=None)
+    dialog.redirect_outerr_stream()
+    stdin = sys.stdin
+    sys.stdin = dialog
+
+    pending = ['!_bench_mark()'] * commands + ['continue']
+    command_latencies = []
+    wakeup_latencies = []
+
+    def type_command():
+        # Console is enabled while readline waits for input
+        if not pending or not dialog.console.isEnabled():
+            return
+        QtWidgets.QPlainTextEdit.insertPlainText(dialog.console, pending.pop(0))
+        dialog.console.keyPressEvent(QtGui.QKeyEvent(
+            QtCore.QEvent.Type.KeyPress, QtCore.Qt.Key.Key_Return, QtCore.Qt.KeyboardModifier.NoModifier
+        ))
+
+    def bench_mark():
+        session = dialog.get_session()
+        command_latencies.append(time.perf_counter() - session.submit_time)
+        wakeup_latencies.append(session.wakeup_latency)
+
+    typer = QtCore.QTimer()
+    typer.timeout.connect(type_command)
+    typer.start(1)
+    try:
+        _bench_mark = bench_mark  # noqa: F841, used by pdb commands
+        set_trace()
+        app.processEvents()
+    finally:
+        typer.stop()
+        sys.stdin = stdin
+        restore_streams()
+        dialog.close()
+    return {
+        'wakeup_s': statistics.median(wakeup_latencies),
+        'submit_to_command_s': statistics.median(command_latencies),
+    }
+
+
+def measure_watches(watches=100, steps=100):
+    """
+    Step through a loop with 'next' while watches are registered, one of them expensive
+    :param watches:
+    :param steps:
+    :return: dict with seconds per step without and with watches
+    """
+    app = get_application()
+    stdin = sys.stdin
+    results = {}
+    for count in (0, watches):
+        dialog = MyBreakPoint(history_file=None)
+        dialog.redirect_outerr_stream()
+        sys.stdin = dialog
+        for index in range(count - 1):
+            dialog.watch_panel.add_watch('values[{}] + {}'.format(index % 10, index))
+        if count:
+            dialog.watch_panel.add_watch('sum(range(200000))')
+        pending = ['next'] * steps + ['continue']
+
+        def type_command():
+            if not pending or not dialog.console.isEnabled():
+                return
+            QtWidgets.QPlainTextEdit.insertPlainText(dialog.console, pending.pop(0))
+            dialog.console.keyPressEvent(QtGui.QKeyEvent(
+                QtCore.QEvent.Type.KeyPress, QtCore.Qt.Key.Key_Return, QtCore.Qt.KeyboardModifier.NoModifier
+            ))
+
+        def loop():
+            values = list(range(10))
+            set_trace()
+            for step in range(steps):
+                values[step % 10] += 1
+
+        typer = QtCore.QTimer()
+        typer.timeout.connect(type_command)
+        typer.start(1)
+        try:
+            start = time.perf_counter()
+            loop()
+            results['step_s_{}_watches'.format(count)] = (time.perf_counter() - start) / steps
+            app.processEvents()
+        finally:
+            typer.stop()
+            sys.stdin = stdin
+            restore_streams()
+            dialog.close()
+    return results
+
+
+def measure_inspector(keys=1000000, runs=5):
+    """
+    Show a frame holding a dict with keys items and expand it, only the first page is fetched
+    :param keys:
+    :param runs:
+    :return: median seconds from set_frame to painted rows
+    """
+    app = get_application()
+    dialog = MyBreakPoint(history_file=None)
+    big = {index: list(range(100)) for index in range(keys)}  # noqa: F841, inspected below
+    frame = sys._getframe()
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        dialog.inspector.set_frame(frame)
+        model = dialog.inspector.model()
+        frame_locals = model.index(0, 0)
+        row = list(frame.f_locals).index('big')
+        dialog.inspector.expand(model.index(row, 0, frame_locals))
+        app.processEvents()
+        timings.append(time.perf_counter() - start)
+    dialog.close()
+    return statistics.median(timings)
+
+
+def measure_completion(names=50000, lookups=1000):
+    """
+    Complete prefixes in a frame whose globals hold many names
+    :param names: globals in frame
+    :param lookups:
+    :return: dict with seconds to build the index and median seconds per completion
+    """
+    frame_globals = {'name_{}'.format(index): index for index in range(names)}
+    frame = eval('__import__("sys")._getframe()', frame_globals)
+    completer = Completer()
+
+    start = time.perf_counter()
+    completer.get_index(frame)
+    build = time.perf_counter() - start
+
+    timings = []
+    for index in range(lookups):
+        start = time.perf_counter()
+        completer.complete('p name_{}'.format(index * names // lookups), frame)
+        timings.append(time.perf_counter() - start)
+    return {
+        'index_build_s': build,
+        'complete_s': statistics.median(timings),
+    }
+
+
+def measure_search(lines=200000, queries=20):
+    """
+    Find a value in a large scrollback through the find bar index, and through QTextDocument.find
+    :param lines: console lines
+    :param queries:
+    :return: dict with median seconds per search of each
+    """
+    get_application()
+    dialog = MyBreakPoint(max_scrollback=0, history_file=None)
+    dialog.console.insertPlainText(''.join('value {} = {}\n'.format(index, index * 7) for index in range(lines)))
+    document = dialog.console.document()
+    dialog.search_bar.sync()
+
+    index_timings, document_timings = [], []
+    for query in range(queries):
+        text = '= {}'.format(query * lines * 7 // queries)
+        start = time.perf_counter()
+        dialog.search_bar.index.search(text)
+        index_timings.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        document.find(text, document.characterCount() - 1, QtGui.QTextDocument.FindFlag.FindBackward)
+        document_timings.append(time.perf_counter() - start)
+    dialog.close()
+    return {
+        'index_search_s': statistics.median(index_timings),
+        'document_find_s': statistics.median(document_timings),
+    }
+
+
+def measure_console():
+    """
+    :return: dict of all console measurements
+    """
+    return {
+        'construction_s': measure_construction(),
+        'write_lines_per_s': measure_write(),
+        'write_buffered_lines_per_s': measure_write(buffered=True),
+        'keypress_large_scrollback_s': measure_keypress(),
+        'readline': measure_readline(),
+        'inspector_large_frame_s': measure_inspector(),
+        'completion': measure_completion(),
+        'search': measure_search(),
+        'watches': measure_watches(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.parse_args()
+
+    print(json.dumps({
+        'benchmark': 'console',
+        'results': measure_console(),
+    }))
+
+
+if __name__ == '__main__':
+    main()
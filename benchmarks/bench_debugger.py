@@ -0,0 +1,171 @@
+"""
+Time a CPU-bound workload running after a breakpoint, under each debugger backend.
+
+Scenarios:
+    next        - 'next' over the workload call
+    continue    - 'continue' while a breakpoint is set on a line that is never reached
+    threads     - 'next' over the workload call in THREADS threads debugged at once, fails unless
+                  every thread stops in its own frame
+
+Usage:
+    python benchmarks/bench_debugger.py [--size N]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+from helpus.debugger import BACKEND_MONITORING, BACKEND_SETTRACE, HAS_MONITORING  # noqa: E402
+
+SCRIPT = '''
+import io, sys, time
+from helpus.debugger import set_trace
+
+
+def add(a, b):
+    return a + b
+
+
+def workload(size):
+    total = 0
+    for index in range(size):
+        total = add(total, index)
+    return total
+
+
+def never_called():
+    return None
+
+
+def main():
+    set_trace(backend=sys.argv[1])
+    start = time.perf_counter()
+    workload(int(sys.argv[2]))
+    elapsed = time.perf_counter() - start
+    sys.stdout = sys.__stdout__
+    print(elapsed)
+
+
+commands = {
+    'next': 'next\\nnext\\ncontinue\\n',
+    'continue': 'break never_called\\ncontinue\\n',
+}
+sys.stdin = io.StringIO(commands[sys.argv[3]])
+sys.stdout = io.StringIO()
+main()
+'''
+
+SCRIPT_THREADS = '''
+import io, sys, threading, time
+from helpus.debugger import get_debugger_class
+
+
+def add(a, b):
+    return a + b
+
+
+def workload(size):
+    total = 0
+    for index in range(size):
+        total = add(total, index)
+    return total
+
+
+class Commands(io.StringIO):
+    """
+    pdb input of one thread, waits at its first prompt until the next thread stopped too
+    """
+
+    def __init__(self, text, stopped, next_stopped):
+        super().__init__(text)
+        self.stopped = stopped
+        self.next_stopped = next_stopped
+
+    def readline(self, *args):
+        self.stopped.set()
+        self.next_stopped.wait()
+        return super().readline(*args)
+
+
+def work(previous, stopped, following, outputs, elapsed):
+    output = io.StringIO()
+    debugger = get_debugger_class(sys.argv[1])(
+        stdin=Commands('next\\nnext\\ncontinue\\n', stopped, following), stdout=output)
+    debugger.use_rawinput = False
+    # Armed while the previous thread is stopped stepping, with its events on
+    previous.wait()
+    debugger.set_trace(sys._getframe())
+    start = time.perf_counter()
+    workload(int(sys.argv[2]))
+    elapsed.append(time.perf_counter() - start)
+    outputs.append(output.getvalue())
+
+
+threads = int(sys.argv[3])
+# stopped[index + 1]: thread index is at its first prompt; no thread before the first or after the last
+stopped = [threading.Event() for _ in range(threads + 2)]
+stopped[0].set()
+stopped[-1].set()
+outputs, elapsed = [], []
+workers = [threading.Thread(target=work, args=(*stopped[index:index + 3], outputs, elapsed))
+           for index in range(threads)]
+for worker in workers:
+    worker.start()
+for worker in workers:
+    worker.join()
+for output in outputs:
+    # First stop is the line after set_trace, in work()
+    if not output.startswith('> ') or 'work()' not in output.splitlines()[0]:
+        raise SystemExit('thread stopped outside its frame: ' + output.splitlines()[0])
+print(max(elapsed))
+'''
+THREADS = 4
+
+
+def measure_debugger(size=300000):
+    """
+    :param size: workload iterations
+    :return: dict of scenario -> backend -> seconds
+    """
+    backends = [BACKEND_SETTRACE]
+    if HAS_MONITORING:
+        backends.append(BACKEND_MONITORING)
+
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    results = {}
+    for scenario in ('next', 'continue'):
+        results[scenario] = {}
+        for backend in backends:
+            output = subprocess.check_output(
+                [sys.executable, '-c', SCRIPT, backend, str(size), scenario], env=env, cwd=ROOT
+            )
+            results[scenario][backend] = float(output.decode().strip().splitlines()[-1])
+    results['threads'] = {}
+    for backend in backends:
+        output = subprocess.check_output(
+            [sys.executable, '-c', SCRIPT_THREADS, backend, str(size // THREADS), str(THREADS)], env=env, cwd=ROOT
+        )
+        results['threads'][backend] = float(output.decode().strip().splitlines()[-1])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=300000)
+    args = parser.parse_args()
+
+    print(json.dumps({
+        'benchmark': 'debugger_backend',
+        'unit': 's',
+        'python': sys.version.split()[0],
+        'results': measure_debugger(args.size),
+    }))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Compare call overhead of a plain method and of a breakpoint hook that does not break.
+
+Usage:
+    python benchmarks/bench_hook.py [--number N]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpus.hooks import wrap_with_breakpoint  # noqa: E402
+
+
+def target(value, level=0):
+    return value
+
+
+def measure_hook(number=1000000):
+    """
+    :param number: calls per measurement
+    :return: dict of name -> ns per call
+    """
+    cases = {
+        'plain': target,
+        'hook_disabled': wrap_with_breakpoint(target, enabled=False),
+        'hook_condition_false': wrap_with_breakpoint(target, condition=lambda value, level=0: level > 0),
+        'hook_hit_count_not_reached': wrap_with_breakpoint(target, hit_count=number * 10),
+    }
+    results = {}
+    for name, function in cases.items():
+        best = min(timeit.repeat(lambda: function(1), number=number, repeat=5))
+        results[name] = best / number * 1e9
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--number', type=int, default=1000000)
+    args = parser.parse_args()
+
+    print(json.dumps({
+        'benchmark': 'breakpoint_hook_overhead',
+        'unit': 'ns/call',
+        'results': measure_hook(args.number),
+    }))
+
+
+if __name__ == '__main__':
+    main()
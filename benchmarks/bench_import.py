@@ -0,0 +1,52 @@
+"""
+Measure 'import helpus' time in fresh interpreters.
+
+Usage:
+    python benchmarks/bench_import.py [--runs N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import helpus; "
+    "print(time.perf_counter() - t)"
+)
+
+
+def measure_import(runs=20):
+    """
+    Import helpus in 'runs' fresh interpreters
+    :param runs:
+    :return: list of seconds
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    timings = []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, '-c', IMPORT_SNIPPET], env=env, cwd=ROOT)
+        timings.append(float(output.decode().strip()))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    timings = measure_import(args.runs)
+    print(json.dumps({
+        'benchmark': 'import_helpus',
+        'runs': args.runs,
+        'median_s': statistics.median(timings),
+        'min_s': min(timings),
+    }))
+
+
+if __name__ == '__main__':
+    main()
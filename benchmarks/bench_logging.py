@@ -0,0 +1,89 @@
+"""
+Compare logging through LogHandler with logging formatted as text into the console, and measure
+LogView refresh and filter time.
+
+Usage:
+    python benchmarks/bench_logging.py [--records N]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_console import get_application, restore_streams  # noqa: E402
+from helpus.core import MyBreakPoint, XStream  # noqa: E402
+
+
+def log_records(logger, records):
+    start = time.perf_counter()
+    for index in range(records):
+        logger.getChild('db' if index % 2 else 'web').info('record %d of %s', index, 'bench')
+    return time.perf_counter() - start
+
+
+def measure_logging(records=100000):
+    """
+    :param records:
+    :return: dict of results
+    """
+    app = get_application()
+    logger = logging.getLogger('bench_logging')
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+
+    # Text: StreamHandler formatting every record into the console
+    dialog = MyBreakPoint(history_file=None)
+    dialog.redirect_outerr_stream(buffered=True)
+    handler = logging.StreamHandler(XStream.stdout())
+    logger.addHandler(handler)
+    try:
+        start = time.perf_counter()
+        log_records(logger, records)
+        XStream.stdout().flush()
+        app.processEvents()
+        text_elapsed = time.perf_counter() - start
+    finally:
+        logger.removeHandler(handler)
+        restore_streams()
+        dialog.close()
+
+    # Structured: LogHandler ring buffer and LogView
+    dialog = MyBreakPoint(history_file=None)
+    handler = dialog.attach_logging(logger)
+    try:
+        start = time.perf_counter()
+        log_records(logger, records)
+        dialog.log_view.refresh()
+        app.processEvents()
+        handler_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        dialog.log_view.logger_filter.setText('bench_logging.db')
+        app.processEvents()
+        filter_elapsed = time.perf_counter() - start
+    finally:
+        logger.removeHandler(handler)
+        dialog.close()
+    return {
+        'records': records,
+        'text_console_records_per_s': records / text_elapsed,
+        'log_handler_records_per_s': records / handler_elapsed,
+        'logger_filter_s': filter_elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--records', type=int, default=100000)
+    args = parser.parse_args()
+
+    print(json.dumps({'benchmark': 'logging', 'results': measure_logging(args.records)}))
+
+
+if __name__ == '__main__':
+    main()
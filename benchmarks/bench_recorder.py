@@ -0,0 +1,70 @@
+"""
+Measure SessionRecorder cost on the writing thread and RecordingReader indexing/page time for a
+large recording.
+
+Usage:
+    python benchmarks/bench_recorder.py [--records N]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpus.recorder import INPUT, STDOUT, RecordingReader, SessionRecorder  # noqa: E402
+
+
+def measure_recorder(records=500000):
+    """
+    :param records: texts recorded, one input every 10
+    :return: dict of results
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'session.hrec')
+        recorder = SessionRecorder(path)
+        start = time.perf_counter()
+        for index in range(records):
+            if index % 10:
+                recorder.record(STDOUT, 'output line {}\n'.format(index))
+            else:
+                recorder.record(INPUT, 'p value_{}'.format(index))
+        record_elapsed = time.perf_counter() - start
+        recorder.close()
+        total_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        reader = RecordingReader(path)
+        index_elapsed = time.perf_counter() - start
+        timings = []
+        for page in range(0, reader.page_count, max(1, reader.page_count // 50)):
+            start = time.perf_counter()
+            reader.page(page)
+            timings.append(time.perf_counter() - start)
+        result = {
+            'records': records,
+            'record_call_s': record_elapsed / records,
+            'written_records_per_s': records / total_elapsed,
+            'file_bytes': os.path.getsize(path),
+            'index_s': index_elapsed,
+            'pages': reader.page_count,
+            'page_s': statistics.median(timings),
+        }
+        reader.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--records', type=int, default=500000)
+    args = parser.parse_args()
+
+    print(json.dumps({'benchmark': 'recorder', 'results': measure_recorder(args.records)}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Measure remote attach over localhost: import cost of the debugged side, readline round trip and
+output throughput, with a headless RemoteClient answering pdb.
+
+Usage:
+    python benchmarks/bench_remote.py [--commands N] [--lines N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpus.debugger import set_trace  # noqa: E402
+from helpus.remote import RemoteClient, RemoteServer  # noqa: E402
+
+
+def measure_remote_import():
+    """
+    :return: seconds to import helpus.remote in a fresh interpreter, and whether PyQt5 got loaded
+    """
+    code = (
+        'import sys, time; start = time.perf_counter(); import helpus.remote; '
+        'print(time.perf_counter() - start, "PyQt5" in sys.modules)'
+    )
+    output = subprocess.check_output(
+        [sys.executable, '-c', code], cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    elapsed, qt_loaded = output.split()
+    return {'import_s': float(elapsed), 'pyqt_loaded': qt_loaded == b'True'}
+
+
+def measure_round_trip(commands=200, lines=20000):
+    """
+    Run pdb against a localhost server, client answers every readline as soon as it is asked
+    :param commands: pdb commands executed
+    :param lines: lines printed by the debugged code after continue
+    :return: dict of results
+    """
+    server = RemoteServer(('127.0.0.1', 0))
+    server.listen()
+    stdin, stdout, stderr = sys.stdin, sys.stdout, sys.stderr
+    pending = ['!_bench_mark()'] * commands + ['continue']
+    asked = []
+    round_trips = []
+    received = threading.Event()
+    received_lines = [0]
+
+    def on_readline(ident, name, pid):
+        asked.append(time.perf_counter())
+        client.send_input(ident, pending.pop(0))
+
+    def on_output(stream, data):
+        received_lines[0] += data.count('\n')
+        if 'done' in data:
+            received.set()
+
+    def bench_mark():
+        round_trips.append(time.perf_counter() - asked[-1])
+
+    client = RemoteClient(server.address, on_output=on_output, on_readline=on_readline, token=server.token)
+    client.connect()
+    try:
+        sys.stdin = server
+        server.redirect_outerr_stream()
+        _bench_mark = bench_mark  # noqa: F841, used by pdb commands
+        set_trace()
+        start = time.perf_counter()
+        for index in range(lines):
+            print('line {}'.format(index))
+        print('done')
+        received.wait(30)
+        elapsed = time.perf_counter() - start
+    finally:
+        sys.stdin, sys.stdout, sys.stderr = stdin, stdout, stderr
+        client.close()
+        server.close()
+    return {
+        'readline_round_trip_s': statistics.median(round_trips),
+        'output_lines_per_s': lines / elapsed,
+        'output_lines_received': received_lines[0],
+    }
+
+
+def measure_remote():
+    """
+    :return: dict of all remote measurements
+    """
+    return dict(measure_remote_import(), **measure_round_trip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--commands', type=int, default=200)
+    parser.add_argument('--lines', type=int, default=20000)
+    args = parser.parse_args()
+
+    results = dict(measure_remote_import(), **measure_round_trip(args.commands, args.lines))
+    print(json.dumps(dict(benchmark='remote', results=results)))
+
+
+if __name__ == '__main__':
+    main()
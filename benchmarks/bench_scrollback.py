@@ -0,0 +1,95 @@
+"""
+Stream a million lines through a console capped at max_scrollback lines, and record memory (RSS)
+and write latency per line before and after the cap is reached, when every write evicts a line.
+
+Usage:
+    python benchmarks/bench_scrollback.py [--lines N] [--max-scrollback N]
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_console import get_application, restore_streams  # noqa: E402
+from helpus.core import MyBreakPoint, XStream  # noqa: E402
+
+WINDOW = 10000  # lines per latency sample
+
+
+def current_rss():
+    """
+    :return: resident set size in MiB, peak RSS where /proc is not available
+    """
+    try:
+        with open('/proc/self/statm') as fp_r:
+            return int(fp_r.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Bytes on macOS, KiB elsewhere
+        return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def measure_scrollback(lines=1000000, max_scrollback=MyBreakPoint.MAX_SCROLLBACK):
+    """
+    :param lines: lines written through XStream, one write each
+    :param max_scrollback:
+    :return: dict of results, latencies in microseconds per line
+    """
+    app = get_application()
+    dialog = MyBreakPoint(max_scrollback=max_scrollback, history_file=None)
+    dialog.redirect_outerr_stream()
+    stream = XStream.stdout()
+    rss_start = current_rss()
+    rss_at_cap = None
+    latencies = []
+    try:
+        start = time.perf_counter()
+        for window_start in range(0, lines, WINDOW):
+            window_time = time.perf_counter()
+            for index in range(window_start, min(window_start + WINDOW, lines)):
+                stream.write('line {} of the scrollback benchmark\n'.format(index))
+            app.processEvents()
+            latencies.append((window_start, (time.perf_counter() - window_time) / WINDOW * 1e6))
+            if rss_at_cap is None and window_start + WINDOW >= max_scrollback:
+                rss_at_cap = current_rss()
+        elapsed = time.perf_counter() - start
+        rss_end = current_rss()
+        blocks = dialog.console.document().blockCount()
+    finally:
+        restore_streams()
+        dialog.close()
+
+    before_cap = [latency for window_start, latency in latencies if window_start + WINDOW <= max_scrollback]
+    after_cap = [latency for window_start, latency in latencies if window_start >= max_scrollback]
+    return {
+        'lines': lines,
+        'max_scrollback': max_scrollback,
+        'console_blocks': blocks,
+        'elapsed_s': elapsed,
+        'line_us_before_cap': statistics.mean(before_cap) if before_cap else None,
+        'line_us_after_cap': statistics.median(after_cap) if after_cap else None,
+        'line_us_after_cap_max': max(after_cap) if after_cap else None,
+        'rss_start_mib': rss_start,
+        'rss_at_cap_mib': rss_at_cap,
+        'rss_end_mib': rss_end,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lines', type=int, default=1000000)
+    parser.add_argument('--max-scrollback', type=int, default=MyBreakPoint.MAX_SCROLLBACK)
+    args = parser.parse_args()
+
+    results = measure_scrollback(args.lines, args.max_scrollback)
+    print(json.dumps(dict(benchmark='scrollback', **results)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Measure snapshot capture time (serialization on the calling thread) for small and huge frames, and
+the size of the written snapshots.
+
+Usage:
+    python benchmarks/bench_snapshot.py [--runs N]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpus.snapshot import Snapshot, capture, get_writer  # noqa: E402
+
+
+def small_frame(directory):
+    value = 42  # noqa: F841, captured
+    name = 'small'  # noqa: F841, captured
+    return capture(directory)
+
+
+def huge_frame(directory):
+    mapping = {index: 'value {}'.format(index) for index in range(1000000)}  # noqa: F841, captured
+    rows = [list(range(100)) for _ in range(10000)]  # noqa: F841, captured
+    text = 'x' * 10000000  # noqa: F841, captured
+    start = time.perf_counter()
+    path = capture(directory)
+    return path, time.perf_counter() - start
+
+
+def measure_snapshot(runs=20):
+    """
+    :param runs:
+    :return: dict of results
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        small = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            small_frame(directory)
+            small.append(time.perf_counter() - start)
+
+        huge = []
+        for _ in range(max(1, runs // 4)):
+            path, elapsed = huge_frame(directory)
+            huge.append(elapsed)
+        # Wait for background writes
+        get_writer().close()
+        start = time.perf_counter()
+        snapshot = Snapshot(path)
+        load_elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        snapshot.frame_locals(len(snapshot.frames) - 1)
+        frame_elapsed = time.perf_counter() - start
+        return {
+            'capture_small_s': statistics.median(small),
+            'capture_huge_s': statistics.median(huge),
+            'huge_snapshot_bytes': os.path.getsize(path),
+            'load_header_s': load_elapsed,
+            'load_frame_locals_s': frame_elapsed,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    print(json.dumps({'benchmark': 'snapshot', 'results': measure_snapshot(args.runs)}))
+
+
+if __name__ == '__main__':
+    main()
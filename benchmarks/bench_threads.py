@@ -0,0 +1,88 @@
+"""
+Stress console with many threads printing at once and measure GUI event loop stalls.
+
+Usage:
+    python benchmarks/bench_threads.py [--threads N] [--lines N] [--buffered]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5 import QtCore, QtWidgets  # noqa: E402
+
+from helpus.core import MyBreakPoint, XStream  # noqa: E402
+
+TICK_INTERVAL = 5  # ms
+
+
+def measure_threads(threads=16, lines=2000, buffered=False):
+    """
+    :param threads:
+    :param lines: lines printed by each thread
+    :param buffered: use XStream buffered mode
+    :return: dict of results
+    """
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+    dialog = MyBreakPoint(history_file=None)
+    dialog.redirect_outerr_stream(buffered=buffered)
+
+    # Record gaps between timer ticks, a large gap means the GUI was not responsive
+    ticks = []
+    tick_timer = QtCore.QTimer()
+    tick_timer.timeout.connect(lambda: ticks.append(time.perf_counter()))
+    tick_timer.start(TICK_INTERVAL)
+
+    # Workers start printing together, starting busy threads would otherwise hold the main thread
+    go = threading.Event()
+
+    def worker(index):
+        go.wait()
+        for line in range(lines):
+            print('thread {} line {}'.format(index, line))
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    for item in workers:
+        item.start()
+    start = time.perf_counter()
+    go.set()
+    # Output left once workers are done is inserted by the event loop too
+    stream = XStream.stdout()
+    while any(item.is_alive() for item in workers) or stream.pending:
+        app.processEvents()
+    elapsed = time.perf_counter() - start
+
+    tick_timer.stop()
+    sys.stdout = sys.__stdout__
+    sys.stderr = sys.__stderr__
+    ticks = [start] + ticks + [start + elapsed]
+    gaps = [second - first for first, second in zip(ticks, ticks[1:])]
+    dialog.close()
+    return {
+        'threads': threads,
+        'lines_per_thread': lines,
+        'buffered': buffered,
+        'elapsed_s': elapsed,
+        'max_gui_stall_s': max(gaps),
+        'console_blocks': dialog.console.document().blockCount(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--lines', type=int, default=2000)
+    parser.add_argument('--buffered', action='store_true')
+    args = parser.parse_args()
+
+    results = measure_threads(args.threads, args.lines, args.buffered)
+    print(json.dumps(dict(benchmark='threaded_output', **results)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Run every HelpUs benchmark headless (QT_QPA_PLATFORM=offscreen) and store results as JSON,
+so runs of different versions can be compared.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--output results.json]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bench_console  # noqa: E402
+import bench_debugger  # noqa: E402
+import bench_hook  # noqa: E402
+import bench_import  # noqa: E402
+import bench_logging  # noqa: E402
+import bench_recorder  # noqa: E402
+import bench_remote  # noqa: E402
+import bench_scrollback  # noqa: E402
+import bench_snapshot  # noqa: E402
+import bench_threads  # noqa: E402
+from helpus import __version__  # noqa: E402
+
+
+def run_benchmarks():
+    """
+    :return: dict with environment and results of each benchmark
+    """
+    import_timings = bench_import.measure_import()
+    return {
+        'helpus_version': __version__,
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'results': {
+            'import_s': min(import_timings),
+            'console': bench_console.measure_console(),
+            'threaded_output': bench_threads.measure_threads(buffered=True),
+            'scrollback': bench_scrollback.measure_scrollback(),
+            'breakpoint_hook_ns': bench_hook.measure_hook(),
+            'debugger_backend_s': bench_debugger.measure_debugger(),
+            'remote': bench_remote.measure_remote(),
+            'recorder': bench_recorder.measure_recorder(),
+            'snapshot': bench_snapshot.measure_snapshot(),
+            'logging': bench_logging.measure_logging(),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--output', help='write results to this file instead of stdout')
+    args = parser.parse_args()
+
+    results = json.dumps(run_benchmarks(), indent=2)
+    if args.output:
+        with open(args.output, 'w') as fp_w:
+            fp_w.write(results)
+    else:
+        print(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,42 +1,48 @@
+import importlib
 import os
 
 # Do not Import Stuff from 'module' here because will raise ImportError because of Circular import
 
-# Define Icon Path
-icon_file_path = os.path.join(os.path.dirname(__file__), 'resources', 'ico', 'snake.ico')
-
-try:
-    # Try to restore files
-    from stringify import unstringify
-    from .resources.resources import snake_ico as ico_data
-
-    # Restore Files
-    if not os.path.exists(os.path.dirname(icon_file_path)):
-        os.makedirs(os.path.dirname(icon_file_path))
-    with open(icon_file_path, 'wb+') as fp_w:
-        fp_w.write(
-            unstringify(ico_data)
-        )
-except ImportError as e:
-    print('HelpUs Import Error !0!')
-    pass
-
-else:
-    # Module Imports
-    from .version import __version__
-    from .core import (
-        MyBreakPoint,
-        setup_breakpoint_hook,
-        get_qtconsole_object
-    )
-
-    # ------------------------------------
-
-    # Export Visible Items
-    __all__ = [
-        '__version__',
-        'icon_file_path',
-        'MyBreakPoint',
-        'get_qtconsole_object',
-        'setup_breakpoint_hook',
-    ]
+# Module Imports
+from .version import __version__
+
+# Define Icon Path (legacy, icon is now loaded from memory, see resources.get_icon_data)
+icon_file_path = os.path.join(os.path.dirname(__file__), 'resources', 'ico', 'snake_ico.ico')
+
+# Items imported from their module on first access, so PyQt5 is not loaded by 'import helpus'
+_LAZY_ITEMS = {
+    'MyBreakPoint': 'core',
+    'setup_breakpoint_hook': 'core',
+    'setup_log_handler': 'core',
+    'get_qtconsole_object': 'core',
+    'wrap_with_breakpoint': 'hooks',
+    'HookControl': 'hooks',
+    'wrap_with_snapshot': 'hooks',
+    'get_debugger_class': 'debugger',
+    'setup_remote_breakpoint_hook': 'remote',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ITEMS:
+        module = importlib.import_module('.' + _LAZY_ITEMS[name], __name__)
+        return getattr(module, name)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+# ------------------------------------
+
+# Export Visible Items
+__all__ = [
+    '__version__',
+    'icon_file_path',
+    'MyBreakPoint',
+    'get_qtconsole_object',
+    'setup_breakpoint_hook',
+    'setup_log_handler',
+    'wrap_with_breakpoint',
+    'HookControl',
+    'wrap_with_snapshot',
+    'get_debugger_class',
+    'setup_remote_breakpoint_hook',
+]
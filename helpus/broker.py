@@ -0,0 +1,117 @@
+import atexit
+import os
+import secrets
+import socket
+import sys
+import threading
+
+# Environment variable holding the broker 'PID/TOKEN@HOST:PORT', inherited by child processes
+BROKER_ENV = 'HELPUS_BROKER'
+
+# Child side connection, per process id so forked children do not reuse the parent's
+_child_server = None
+_child_pid = None
+
+
+def broker_environ():
+    """
+    :return: (pid, token, address) of the broker found in BROKER_ENV, None if unset
+    """
+    value = os.environ.get(BROKER_ENV)
+    if not value:
+        return None
+    pid, _, value = value.partition('/')
+    token, _, address = value.partition('@')
+    return int(pid), token, address
+
+
+def is_child_process():
+    """
+    Also True while a spawned child imports __main__ again, before multiprocessing knows its parent
+    :return: True in a child of a process running a ProcessBroker
+    """
+    environ = broker_environ()
+    return environ is not None and environ[0] != os.getpid()
+
+
+def connect_to_broker():
+    """
+    Send pdb input/output of this child process to the parent's console. Called when a hook breaks,
+    so idle workers never open a connection
+    :return: RemoteServer installed as sys.stdin, None outside of a child process
+    """
+    global _child_server, _child_pid
+    if _child_pid == os.getpid():
+        return _child_server
+    if not is_child_process():
+        return None
+    from .remote import RemoteServer
+
+    _, token, address = broker_environ()
+    server = RemoteServer(address, token=token)
+    server.connect()
+    atexit.register(server.close)
+    sys.stdin = server
+    server.redirect_outerr_stream()
+    _child_server, _child_pid = server, os.getpid()
+    return server
+
+
+class ProcessBroker:
+    """
+    Listens for child processes hitting a breakpoint and serves them through the parent's MyBreakPoint.
+    Every thread of every child waiting for input is listed as '<pid>: <thread name>' in the session
+    selector. Children prove they were started by this process with the random token given in BROKER_ENV
+    """
+    SESSION_NAME = '{pid}: {name}'
+
+    def __init__(self, dialog, address=('127.0.0.1', 0)):
+        """
+
+        :param dialog: MyBreakPoint of this process
+        :param address: (host, port), port 0 picks a free one
+        """
+        self.dialog = dialog
+        self._socket = socket.create_server(address)
+        self.address = self._socket.getsockname()[:2]
+        self.token = secrets.token_urlsafe(16)
+        self._clients = []
+        self._thread = None
+
+    def start(self):
+        """
+        Accept children in a daemon thread, children started from now on find the broker through BROKER_ENV
+        :return:
+        """
+        if self._thread is not None:
+            return
+        # Import here, not in the accept thread: a child forked while another thread imports would
+        # inherit the held import lock
+        from .remote import console_client
+
+        os.environ[BROKER_ENV] = self.__environ()
+        self._thread = threading.Thread(target=self._accept, args=(console_client,), name='HelpUs Broker',
+                                        daemon=True)
+        self._thread.start()
+
+    def _accept(self, console_client):
+        while True:
+            try:
+                sock, _ = self._socket.accept()
+            except OSError:
+                # Closed by close()
+                return
+            client = console_client(self.dialog, session_name=self.SESSION_NAME, token=self.token)
+            client.start(sock, authenticate=True)
+            self._clients.append(client)
+
+    def __environ(self):
+        return '{}/{}@{}:{}'.format(os.getpid(), self.token, *self.address)
+
+    def close(self):
+        if os.environ.get(BROKER_ENV) == self.__environ():
+            del os.environ[BROKER_ENV]
+        self._socket.close()
+        for client in self._clients:
+            client.close()
+        self._clients = []
@@ -0,0 +1,242 @@
+import bisect
+import builtins
+import keyword
+import os
+import re
+
+# Default file keeping console history between runs, readable by its owner only
+HISTORY_FILE = os.path.join(os.path.expanduser('~'), '.helpus_history')
+HISTORY_SIZE = 1000
+
+# Dotted name at the end of the input line, e.g. 'p self.con' -> 'self.con'
+_TOKEN = re.compile(r'[A-Za-z_][\w.]*$|\.?$')
+
+
+class CommandHistory:
+    """
+    Console command history, appended to history_file so it survives restarts
+    """
+
+    def __init__(self, history_file=HISTORY_FILE, max_size=HISTORY_SIZE):
+        """
+
+        :param history_file: None keeps history in memory only
+        :param max_size: entries kept, file is trimmed to this size when loaded
+        """
+        self.history_file = history_file
+        self.max_size = max_size
+        self.entries = []
+        # Position while browsing, len(entries) is the line being typed
+        self.position = 0
+        self._loaded = False
+
+    def _load(self):
+        # Read file on first use, not while constructing the console
+        self._loaded = True
+        if not self.history_file:
+            return
+        try:
+            with open(self.history_file, encoding='utf-8') as fp_r:
+                self.entries = fp_r.read().splitlines()
+                # Files written by earlier versions were created with the default umask
+                if os.stat(fp_r.fileno()).st_mode & 0o077:
+                    os.chmod(self.history_file, 0o600)
+        except OSError:
+            return
+        if len(self.entries) > self.max_size:
+            self.entries = self.entries[-self.max_size:]
+            self._save()
+        self.position = len(self.entries)
+
+    def _open(self, mode):
+        # Commands may hold secrets typed at the prompt, a new file is only readable by the user
+        return open(self.history_file, mode, encoding='utf-8', opener=lambda path, flags: os.open(path, flags, 0o600))
+
+    def _save(self):
+        try:
+            with self._open('w') as fp_w:
+                fp_w.writelines(entry + '\n' for entry in self.entries)
+        except OSError:
+            pass
+
+    def add(self, command):
+        """
+        Remember command, consecutive duplicates are stored once
+        :param command:
+        :return:
+        """
+        if not self._loaded:
+            self._load()
+        command = command.strip('\r\n')
+        if command.strip() and (not self.entries or self.entries[-1] != command):
+            self.entries.append(command)
+            if self.history_file:
+                try:
+                    with self._open('a') as fp_a:
+                        fp_a.write(command + '\n')
+                except OSError:
+                    pass
+            if len(self.entries) > self.max_size:
+                del self.entries[0]
+        self.position = len(self.entries)
+
+    def previous(self):
+        """
+        :return: older entry, None when there is none
+        """
+        if not self._loaded:
+            self._load()
+        if self.position == 0:
+            return None
+        self.position -= 1
+        return self.entries[self.position]
+
+    def next(self):
+        """
+        :return: newer entry, '' when back at the line being typed, None when already there
+        """
+        if self.position >= len(self.entries):
+            return None
+        self.position += 1
+        if self.position == len(self.entries):
+            return ''
+        return self.entries[self.position]
+
+
+class NamespaceIndex:
+    """
+    Sorted names of one frame stop, prefix lookups are a bisect instead of dir() per keystroke.
+    Attribute names are listed once per object and kept until the index is invalidated
+    """
+
+    def __init__(self, namespaces, commands=()):
+        """
+
+        :param namespaces: dicts searched in order, e.g. locals, globals, builtins
+        :param commands: pdb commands, completed as first word of the line
+        """
+        self.namespaces = namespaces
+        self.names = sorted(set().union(*namespaces, keyword.kwlist))
+        self.commands = sorted(commands)
+        self._attributes = {}
+
+    @staticmethod
+    def _matches(names, prefix):
+        start = bisect.bisect_left(names, prefix)
+        end = start
+        while end < len(names) and names[end].startswith(prefix):
+            end += 1
+        return names[start:end]
+
+    def _attribute_names(self, value):
+        key = id(value)
+        cached = self._attributes.get(key)
+        # Keep value referenced so its id is not reused within this stop
+        if cached is None or cached[0] is not value:
+            try:
+                names = sorted(set(dir(value)))
+            except Exception:
+                names = []
+            cached = self._attributes[key] = (value, names)
+        return cached[1]
+
+    def _resolve(self, dotted_name):
+        """
+        Follow a dotted name through namespaces and getattr. Only attribute lookups run, but these
+        execute properties and __getattr__ of the objects on the way
+        :param dotted_name:
+        :return: (found, value)
+        """
+        first, *rest = dotted_name.split('.')
+        for namespace in self.namespaces:
+            if first in namespace:
+                value = namespace[first]
+                break
+        else:
+            return False, None
+        for name in rest:
+            try:
+                value = getattr(value, name)
+            except Exception:
+                return False, None
+        return True, value
+
+    def complete(self, token, first_word=False):
+        """
+        :param token: dotted name being typed
+        :param first_word: token starts the line, pdb commands are candidates too
+        :return: sorted full tokens starting with token
+        """
+        base, dot, prefix = token.rpartition('.')
+        if not dot:
+            matches = self._matches(self.names, prefix)
+            if first_word:
+                matches = sorted(set(matches).union(self._matches(self.commands, prefix)))
+            return matches
+        found, value = self._resolve(base)
+        if not found:
+            return []
+        names = self._attribute_names(value)
+        if not prefix.startswith('_'):
+            names = [name for name in self._matches(names, prefix) if not name.startswith('_')]
+        else:
+            names = self._matches(names, prefix)
+        return [base + '.' + name for name in names]
+
+
+class Completer:
+    """
+    Keeps a NamespaceIndex for the frame being debugged, rebuilt when the frame changes
+    """
+
+    def __init__(self):
+        self._index = None
+        self._frame = None
+        self._lasti = None
+
+    def invalidate(self):
+        self._index = None
+        self._frame = None
+
+    def get_index(self, frame, frame_locals=None, debugger=None):
+        """
+        :param frame:
+        :param frame_locals: locals as seen by pdb, frame.f_locals by default
+        :param debugger: Bdb instance, its do_* methods are completed as commands
+        :return: NamespaceIndex of frame
+        """
+        # Same stop of the same frame -> reuse index
+        if self._index is not None and frame is self._frame and frame.f_lasti == self._lasti:
+            return self._index
+        commands = [name[3:] for name in dir(debugger) if name.startswith('do_')] if debugger else ()
+        self._index = NamespaceIndex([
+            frame.f_locals if frame_locals is None else frame_locals,
+            frame.f_globals,
+            vars(builtins),
+        ], commands)
+        self._frame = frame
+        self._lasti = frame.f_lasti
+        return self._index
+
+    def complete(self, line, frame, frame_locals=None, debugger=None):
+        """
+        :param line: input line up to the cursor
+        :param frame:
+        :param frame_locals:
+        :param debugger:
+        :return: (token, matches) token being the end of line that matches replace
+        """
+        token = _TOKEN.search(line).group()
+        if frame is None:
+            return token, []
+        index = self.get_index(frame, frame_locals, debugger)
+        first_word = not line[:len(line) - len(token)].strip()
+        return token, index.complete(token, first_word)
+
+
+def common_prefix(matches):
+    """
+    :param matches:
+    :return: longest string all matches start with
+    """
+    return os.path.commonprefix(matches) if matches else ''
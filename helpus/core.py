@@ -1,57 +1,286 @@
+import bdb
+import functools
 import io
 import logging
 import os
 import sys
+import threading
+import time
 
 from PyQt5 import QtGui, QtCore, QtWidgets
-from helpus import icon_file_path
-from helpus import __version__
+from .broker import ProcessBroker, is_child_process
+from .completion import HISTORY_FILE, CommandHistory, Completer, common_prefix
+from .debugger import BACKEND_AUTO
+from .highlighter import ConsoleHighlighter
+from .hooks import HookControl, wrap_with_breakpoint  # noqa: F401, HookControl kept importable from core
+from .inspector import VariableInspector
+from .logview import LogHandler, LogView
+from .recorder import INPUT, PROMPT, STDERR, STDOUT, SessionRecorder
+from .resources import get_icon_data
+from .search import SearchBar
+from .snapshot import SnapshotBrowser
+from .tools import PerformanceTools
+from .version import __version__
+from .watch import WatchPanel
 
 LOGGER = logging.getLogger('HelpUs')
 LOGGER.setLevel(logging.DEBUG)
 
 
+def _get_fileno(stream):
+    """
+    :param stream:
+    :return: file descriptor of stream, None if it has none
+    """
+    try:
+        fileno = stream.fileno()
+    except (AttributeError, OSError, ValueError):
+        return None
+    return fileno if fileno >= 0 else None
+
+
 class XStream(QtCore.QObject):
     _stdout = None
     _stderr = None
     messageWritten = QtCore.pyqtSignal(str)
+    _batchStarted = QtCore.pyqtSignal()
+    _drainRequested = QtCore.pyqtSignal()
+
+    # Buffered Mode Defaults
+    FLUSH_INTERVAL = 50  # ms
+    MAX_BATCH_SIZE = 64 * 1024  # chars
+    # Writes of other threads are emitted by the owner thread, MAX_DRAIN_SIZE per event loop pass.
+    # Writers wait for the owner, BACKPRESSURE_TIMEOUT at most, while more than MAX_PENDING is left
+    MAX_DRAIN_SIZE = 4 * 1024  # chars
+    MAX_PENDING = 128 * 1024  # chars
+    BACKPRESSURE_TIMEOUT = 0.05  # s
+
+    def __init__(self, buffered=False, flush_interval=FLUSH_INTERVAL, max_batch_size=MAX_BATCH_SIZE, fileno=None):
+        super().__init__()
+        # Descriptor of the replaced stream, passed on to child processes (e.g. multiprocessing's
+        # resource tracker keeps stderr's)
+        self._fileno = fileno
+        # Writes may come from any thread, chunks are shared between them
+        self._owner_ident = threading.get_ident()
+        self._lock = threading.Lock()
+        self._drained = threading.Condition(self._lock)
+        self._chunks = []
+        self._chunks_size = 0
+        self._draining = False
+        # Chunks pending include writes of other threads
+        self._foreign = False
+
+        # Flush Timer, started by the first write of a batch. Timer lives in the owner thread,
+        # so other threads start it through a queued connection
+        self._flush_timer = QtCore.QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.timeout.connect(self.__drain)
+        self._batchStarted.connect(self._flush_timer.start)
+        # Chunks are emitted in slices by the owner thread, output of many threads does not hold
+        # the GUI for seconds
+        self._drainRequested.connect(self.__drain, QtCore.Qt.ConnectionType.QueuedConnection)
+
+        self.buffered = False
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        self.set_buffered(buffered, flush_interval, max_batch_size)
+
+    def set_buffered(self, buffered=True, flush_interval=None, max_batch_size=None):
+        """
+        Collect writes into chunks which are emitted on a timer or when max_batch_size is reached
+        :param buffered:
+        :param flush_interval: milliseconds
+        :param max_batch_size: characters
+        :return:
+        """
+        if flush_interval is not None:
+            self.flush_interval = flush_interval
+        if max_batch_size is not None:
+            self.max_batch_size = max_batch_size
+        self._flush_timer.setInterval(self.flush_interval)
+
+        if not buffered:
+            self.flush()
+        self.buffered = buffered
+
+    def flush(self):
+        if threading.get_ident() == self._owner_ident:
+            self._flush_timer.stop()
+        with self._lock:
+            if not self._chunks:
+                return
+            msg = ''.join(self._chunks)
+            self._chunks = []
+            self._chunks_size = 0
+            self._foreign = False
+            self._drained.notify_all()
+        # Emitting from another thread is queued to the receiver thread by Qt
+        if not self.signalsBlocked():
+            self.messageWritten.emit(msg)
 
-    @staticmethod
-    def flush():
-        pass
+    @property
+    def pending(self):
+        """
+        :return: characters written but not emitted yet
+        """
+        return self._chunks_size
 
-    @staticmethod
-    def fileno():
-        return -1
+    def __drain(self):
+        """
+        Emit pending chunks, MAX_DRAIN_SIZE at a time when other threads wrote some, the others in
+        the following event loop passes. A batch of the owner thread only is emitted whole
+        :return:
+        """
+        with self._lock:
+            limit = self.MAX_DRAIN_SIZE if self._foreign else max(self.MAX_DRAIN_SIZE, self.max_batch_size)
+            size = 0
+            count = 0
+            for chunk in self._chunks:
+                size += len(chunk)
+                count += 1
+                if size >= limit:
+                    break
+            msg = ''.join(self._chunks[:count])
+            del self._chunks[:count]
+            self._chunks_size -= size
+            self._draining = bool(self._chunks)
+            if not self._draining:
+                self._foreign = False
+            self._drained.notify_all()
+        if self._draining:
+            self._drainRequested.emit()
+        if msg and not self.signalsBlocked():
+            self.messageWritten.emit(msg)
+
+    def fileno(self):
+        if self._fileno is None:
+            raise io.UnsupportedOperation('fileno')
+        return self._fileno
 
     def write(self, msg):
-        if not self.signalsBlocked():
-            self.messageWritten.emit(msg)
+        # stdout and stderr share the console, text still pending in the other stream goes first
+        for stream in (XStream._stdout, XStream._stderr):
+            if stream is not self and stream is not None and stream._chunks:
+                stream.flush()
+
+        foreign = threading.get_ident() != self._owner_ident
+        if not self.buffered and not foreign:
+            # Chunks written before by other threads go first
+            if self._chunks:
+                self.flush()
+            if not self.signalsBlocked():
+                self.messageWritten.emit(msg)
+            return
+
+        with self._lock:
+            # Let the owner thread catch up, inserting competes with writers for the GIL
+            if foreign and self._chunks_size > max(self.MAX_PENDING, 2 * self.max_batch_size):
+                self._drained.wait(self.BACKPRESSURE_TIMEOUT)
+            self._foreign = self._foreign or foreign
+            self._chunks.append(msg)
+            self._chunks_size += len(msg)
+            batch_started = len(self._chunks) == 1
+            # Unbuffered writes of other threads are coalesced until the owner thread is free
+            drain = (not self.buffered or self._chunks_size >= self.max_batch_size) and not self._draining
+            if drain:
+                self._draining = True
+        if drain:
+            self._drainRequested.emit()
+        elif batch_started:
+            self._batchStarted.emit()
 
     @staticmethod
     def stdout():
         if not XStream._stdout:
-            XStream._stdout = XStream()
+            XStream._stdout = XStream(fileno=_get_fileno(sys.stdout))
             sys.stdout = XStream._stdout
         return XStream._stdout
 
     @staticmethod
     def stderr():
         if not XStream._stderr:
-            XStream._stderr = XStream()
+            XStream._stderr = XStream(fileno=_get_fileno(sys.stderr))
             sys.stderr = XStream._stderr
         return XStream._stderr
 
 
+class _SignalWriter:
+    """
+    File-like object emitting writes through a signal, safe to use from worker threads
+    """
+
+    def __init__(self, signal):
+        self.signal = signal
+
+    def write(self, msg):
+        self.signal.emit(msg)
+
+    def flush(self):
+        pass
+
+
+class DebugSession:
+    """
+    One thread stopped in pdb, waiting for console input
+    """
+
+    def __init__(self, thread):
+        self.ident = thread.ident
+        self.name = thread.name
+        self.thread = thread
+        self.value = ''
+        self.ready = threading.Event()
+        self.submit_time = None
+        self.wakeup_latency = None
+        # Debugger instance reading from this session, found on its stack by readline
+        self.debugger = None
+
+    @staticmethod
+    def find_debugger(frame):
+        """
+        :param frame: frame of readline
+        :return: Bdb instance calling readline, None if called from outside a debugger
+        """
+        while frame is not None:
+            instance = frame.f_locals.get('self')
+            if isinstance(instance, bdb.Bdb):
+                return instance
+            frame = frame.f_back
+        return None
+
+    @property
+    def frame(self):
+        return getattr(self.debugger, 'curframe', None)
+
+    @property
+    def frame_locals(self):
+        return getattr(self.debugger, 'curframe_locals', None)
+
+    @property
+    def stack(self):
+        # Pdb builds a new stack list at every stop, watches use it to tell stops apart
+        return getattr(self.debugger, 'stack', None)
+
+
 class MyBreakPoint(QtWidgets.QDialog):
     _stdout = None
     _stderr = None
+    _icon = None
     messageWritten = QtCore.pyqtSignal(str)
+    sessionWaiting = QtCore.pyqtSignal(object)
 
     HOOK_HEADER = '(Pdb) '
     HOOK_INTERACT = '>>> '
     HOOK_LINE_BREAK = '... '
     HOOKS = [HOOK_HEADER, HOOK_INTERACT]
+    HOOK_COLORS = {
+        HOOK_HEADER: QtCore.Qt.GlobalColor.magenta,
+        HOOK_INTERACT: QtCore.Qt.GlobalColor.darkMagenta,
+        HOOK_LINE_BREAK: QtCore.Qt.GlobalColor.darkMagenta,
+    }
+
+    # Maximum number of console lines kept in memory, 0 means unbounded
+    MAX_SCROLLBACK = 10000
 
     BUTTONS = [
         'Continue',
@@ -62,9 +291,35 @@ class MyBreakPoint(QtWidgets.QDialog):
         'Down'
     ]
 
-    def __init__(self, parent=None):
+    # Buttons running PerformanceTools instead of pdb commands
+    TOOL_BUTTONS = [
+        'Profile',
+        'Memory',
+        'Threads'
+    ]
+
+    def __init__(self, parent=None, blocking_wait=True, max_scrollback=MAX_SCROLLBACK, inspector=True,
+                 history_file=HISTORY_FILE, record_file=None, watches=True):
         super().__init__()
 
+        # Sleep in a nested QEventLoop while waiting for input instead of spinning on processEvents
+        self.blocking_wait = blocking_wait
+        self._wait_loop = None
+        self.wakeup_latency = None
+
+        # Sessions: one per thread calling readline, GUI thread is the one creating the dialog
+        self._gui_thread_ident = threading.get_ident()
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+        self._streams_redirected = False
+        self.broker = None
+        self.log_handler = None
+        self.log_view = None
+        # Session Recorder, see start_recording
+        self.recorder = None
+        self._recorder_connections = []
+        self.sessionWaiting.connect(self.__add_waiting_session, QtCore.Qt.ConnectionType.QueuedConnection)
+
         if not parent:
             self.parentWidget = QtWidgets.QMainWindow()
         else:
@@ -77,8 +332,7 @@ class MyBreakPoint(QtWidgets.QDialog):
             self.parentWidget.showNormal()
 
         # Set Icon
-        if icon_file_path and os.path.exists(icon_file_path):
-            self.setWindowIcon(QtGui.QIcon(icon_file_path))
+        self.setWindowIcon(self.get_icon())
 
         # Set Flags
         self.setWindowFlags(
@@ -102,11 +356,54 @@ class MyBreakPoint(QtWidgets.QDialog):
         self.main_layout.addLayout(self.ConsoleLayout)
 
         # Create OutputConsole
-        self.console = QtWidgets.QTextEdit(parent)
+        self.console = QtWidgets.QPlainTextEdit(parent)
         self.console.insertPlainText = self.__insert_plain_text
         self.console.keyPressEvent = self.__key_press_event
         self.ConsoleLayout.addWidget(self.console)
 
+        # Output of other processes, see remote.console_client
+        self.messageWritten.connect(self.console.insertPlainText)
+
+        # Colour text per block, only when blocks are added or changed
+        self.highlighter = ConsoleHighlighter(self.console, self.HOOK_COLORS)
+
+        # Input Anchor: start of user input, right after the last inserted prompt/output
+        self._input_hook = ''
+        self._input_anchor = QtGui.QTextCursor(self.console.document())
+        self._input_anchor.setKeepPositionOnInsert(True)
+
+        # Bound Scrollback, oldest lines are evicted from the top of the document
+        self.console.setUndoRedoEnabled(False)
+        self.set_max_scrollback(max_scrollback)
+
+        # Find Bar (Ctrl+F), searches an index kept in sync with the console
+        self.search_bar = SearchBar(self.console)
+        self.search_bar.hide()
+        self.ConsoleLayout.addWidget(self.search_bar)
+        self.find_shortcut = QtWidgets.QShortcut(QtGui.QKeySequence.StandardKey.Find, self)
+        self.find_shortcut.activated.connect(self.search_bar.open)
+
+        # Command History (Up/Down) and Tab Completion of names in the frame being debugged
+        self.history = CommandHistory(history_file)
+        self.completer = Completer()
+
+        # Create Session Selector, lists threads waiting for input
+        self.session_selector = QtWidgets.QComboBox()
+        self.session_selector.currentIndexChanged.connect(self.__update_frame_views)
+        self.ButtonsLayout.addWidget(self.session_selector)
+
+        # Create Variable Inspector and Watch Panel, next to console
+        self.SideLayout = QtWidgets.QVBoxLayout()
+        self.main_layout.addLayout(self.SideLayout)
+        self.inspector = None
+        if inspector:
+            self.inspector = VariableInspector()
+            self.SideLayout.addWidget(self.inspector)
+        self.watch_panel = None
+        if watches:
+            self.watch_panel = WatchPanel()
+            self.SideLayout.addWidget(self.watch_panel)
+
         # Create buttons
         for button_text in self.BUTTONS:
             # Create Button Name
@@ -117,11 +414,32 @@ class MyBreakPoint(QtWidgets.QDialog):
             # Add Button to Widget
             self.ButtonsLayout.addWidget(getattr(self, button_name))
 
-        # Init Buffer
-        self.buffer = io.StringIO()
+        # Create Tool Buttons
+        self.tools = PerformanceTools()
+        for button_text in self.TOOL_BUTTONS:
+            button_name = 'button_%s' % button_text.lower()
+            setattr(self, button_name, QtWidgets.QPushButton(button_text))
+            getattr(self, button_name).clicked.connect(self.__push_tool_button)
+            self.ButtonsLayout.addWidget(getattr(self, button_name))
+
+        if record_file:
+            self.start_recording(record_file)
+
         self.__set_enable_gui(False)
         self.showNormal()
 
+    @classmethod
+    def get_icon(cls):
+        """
+        Build window icon from embedded data, without touching the filesystem
+        :return:
+        """
+        if cls._icon is None:
+            pixmap = QtGui.QPixmap()
+            pixmap.loadFromData(get_icon_data(), 'ICO')
+            cls._icon = QtGui.QIcon(pixmap)
+        return cls._icon
+
     def __set_enable_gui(self, state=True):
         """
 
@@ -129,36 +447,237 @@ class MyBreakPoint(QtWidgets.QDialog):
         :return:
         """
         self.console.setEnabled(state)
-        for button_text in self.BUTTONS:
+        self.session_selector.setEnabled(state)
+        for button_text in self.BUTTONS + self.TOOL_BUTTONS:
             # Get Button Name
             button_name = 'button_%s' % button_text.lower()
             getattr(self, button_name).setEnabled(state)
         if state:
             self.console.setFocus()
 
-    def redirect_outerr_stream(self):
+    def set_max_scrollback(self, max_scrollback):
+        """
+        Limit console to max_scrollback lines (blocks). 0 disables the limit
+        :param max_scrollback:
+        :return:
         """
+        self.max_scrollback = max_scrollback
+        self.console.document().setMaximumBlockCount(max_scrollback)
 
+    def redirect_outerr_stream(self, buffered=False, flush_interval=None, max_batch_size=None):
+        """
+
+        :param buffered: batch stream writes before inserting them into console
+        :param flush_interval: milliseconds
+        :param max_batch_size: characters
         :return:
         """
         # Link Stream Output
-        XStream.stdout().messageWritten.connect(self.console.insertPlainText)
-        XStream.stderr().messageWritten.connect(self.console.insertPlainText)
+        if self._streams_redirected:
+            return
+        self._streams_redirected = True
+        for stream in (XStream.stdout(), XStream.stderr()):
+            stream.set_buffered(buffered, flush_interval, max_batch_size)
+            stream.messageWritten.connect(self.console.insertPlainText)
+        if self.recorder is not None:
+            self.__connect_recorder()
+
+    def attach_logging(self, logger=None, level=logging.NOTSET, **kwargs):
+        """
+        Keep records of logger in a LogHandler shown in a filterable table under the console
+        :param logger: logging.Logger, root logger by default
+        :param level:
+        :param kwargs: LogHandler options (capacity, backend)
+        :return: LogHandler, add break rules with add_break_rule
+        """
+        if self.log_handler is None:
+            self.log_handler = LogHandler(level, **kwargs)
+            self.log_view = LogView(self.log_handler)
+            self.ConsoleLayout.addWidget(self.log_view)
+        (logger or logging.getLogger()).addHandler(self.log_handler)
+        return self.log_handler
+
+    def start_recording(self, path):
+        """
+        Append console output, prompts and input to a recording, see recorder.RecordingViewer
+        :param path:
+        :return:
+        """
+        if self.recorder is not None:
+            return
+        self.recorder = SessionRecorder(path)
+        self.__connect_recorder()
+
+    def stop_recording(self):
+        if self.recorder is None:
+            return
+        for signal, slot in self._recorder_connections:
+            signal.disconnect(slot)
+        self._recorder_connections = []
+        self.recorder.close()
+        self.recorder = None
+
+    def __connect_recorder(self):
+        """
+        Record streams in the thread writing to them, before output is queued to the console
+        :return:
+        """
+        signals = [(self.messageWritten, STDOUT)]
+        if self._streams_redirected:
+            signals += [(XStream._stdout.messageWritten, STDOUT), (XStream._stderr.messageWritten, STDERR)]
+        for signal, tag in signals[len(self._recorder_connections):]:
+            slot = functools.partial(self.__record, tag)
+            signal.connect(slot, QtCore.Qt.ConnectionType.DirectConnection)
+            self._recorder_connections.append((signal, slot))
+
+    def __record(self, tag, text):
+        """
+        Record stream text, a prompt ending stdout text (what readline is about to wait on) is tagged PROMPT
+        :param tag: STDOUT or STDERR
+        :param text:
+        :return:
+        """
+        recorder = self.recorder
+        if recorder is None:
+            return
+        start = text.rfind('\n') + 1
+        if tag == STDOUT and text.startswith(tuple(self.HOOKS + [self.HOOK_LINE_BREAK]), start):
+            recorder.record(STDOUT, text[:start])
+            recorder.record(PROMPT, text[start:])
+        else:
+            recorder.record(tag, text)
+
+    def serve_child_processes(self):
+        """
+        Serve breakpoints of multiprocessing children started from now on, see broker.ProcessBroker
+        :return:
+        """
+        if self.broker is None:
+            self.broker = ProcessBroker(self)
+            self.broker.start()
+
+    def open_snapshot(self, path):
+        """
+        Browse a snapshot with pdb-style commands, as a session of its own
+        :param path: file written by snapshot.capture
+        :return:
+        """
+        browser = SnapshotBrowser(path, stdin=self, stdout=_SignalWriter(self.messageWritten))
+        thread = threading.Thread(target=browser.cmdloop, name='Snapshot {}'.format(os.path.basename(path)),
+                                  daemon=True)
+        thread.start()
+
+    def get_session(self):
+        """
+        Get session of the calling thread
+        :return:
+        """
+        thread = threading.current_thread()
+        with self._sessions_lock:
+            session = self._sessions.get(thread.ident)
+            if session is None or session.thread is not thread:
+                # Drop sessions of finished threads
+                for ident in [ident for ident, item in self._sessions.items() if not item.thread.is_alive()]:
+                    del self._sessions[ident]
+                session = self._sessions[thread.ident] = DebugSession(thread)
+        return session
 
     def readline(self):
         """
 
         :return:
         """
+        session = self.get_session()
+        session.ready.clear()
+        session.submit_time = None
+        session.debugger = session.find_debugger(sys._getframe(1))
+        # Previous command may have changed names, rebuild completion index on next Tab
+        self.completer.invalidate()
+        # Show pending output before waiting for input
+        for stream in (XStream._stdout, XStream._stderr):
+            if stream is not None:
+                stream.flush()
+
+        if session.ident != self._gui_thread_ident:
+            # Worker Thread: let GUI know through a queued connection and sleep, GIL is released
+            self.sessionWaiting.emit(session)
+            session.ready.wait()
+        else:
+            self.__add_waiting_session(session)
+            while not session.ready.is_set():
+                if self.blocking_wait:
+                    # Sleep until __submit quits the loop
+                    self._wait_loop = QtCore.QEventLoop()
+                    self._wait_loop.exec_()
+                    self._wait_loop = None
+                else:
+                    QtCore.QCoreApplication.processEvents()
+
+        # Measure time spent between submitting the command and returning it to pdb
+        if session.submit_time is not None:
+            session.wakeup_latency = time.perf_counter() - session.submit_time
+            self.wakeup_latency = session.wakeup_latency
+        return session.value
+
+    @QtCore.pyqtSlot(object)
+    def __add_waiting_session(self, session):
+        """
+        List session in selector, select it if no other session is waiting
+        :param session:
+        :return:
+        """
+        if self.session_selector.findData(session.ident) < 0:
+            self.session_selector.addItem(session.name, session.ident)
+        if self.session_selector.currentIndex() < 0:
+            self.session_selector.setCurrentIndex(0)
+        elif self.session_selector.currentData() == session.ident:
+            self.__update_frame_views()
         if not self.console.isEnabled():
             self.__set_enable_gui(True)
-        # Reset Buffer
-        self.__reset_buffer()
-        # Check Position
-        while self.buffer.tell() == 0:
-            QtCore.QCoreApplication.processEvents()
-        value = self.buffer.getvalue()
-        return value
+
+    def __update_frame_views(self):
+        """
+        Show frame of selected session in inspector and watch panel
+        :return:
+        """
+        if self.watch_panel is not None:
+            # Results and frames kept for threads which ended are dropped
+            with self._sessions_lock:
+                scopes = {ident for ident, item in self._sessions.items() if item.thread.is_alive()}
+            self.watch_panel.watches.retain(scopes)
+        session = self._sessions.get(self.session_selector.currentData())
+        if session is None or session.frame is None:
+            if self.inspector is not None:
+                self.inspector.set_frame(None)
+            if self.watch_panel is not None:
+                self.watch_panel.set_frame(None)
+            return
+        if self.inspector is not None:
+            self.inspector.set_frame(session.frame, session.frame_locals)
+        if self.watch_panel is not None:
+            self.watch_panel.set_frame(session.ident, session.stack, session.frame, session.frame_locals)
+
+    def __submit(self, text):
+        """
+        Hand command to selected session and wake up its readline
+        :param text:
+        :return:
+        """
+        index = self.session_selector.currentIndex()
+        if index < 0:
+            return
+        session = self._sessions[self.session_selector.itemData(index)]
+        self.session_selector.removeItem(index)
+        if not self.session_selector.count():
+            self.__set_enable_gui(False)
+
+        if self.recorder is not None:
+            self.recorder.record(INPUT, text)
+        session.value = text
+        session.submit_time = time.perf_counter()
+        session.ready.set()
+        if session.ident == self._gui_thread_ident and self._wait_loop is not None:
+            self._wait_loop.quit()
 
     def __key_press_event(self, event):
         """
@@ -166,102 +685,149 @@ class MyBreakPoint(QtWidgets.QDialog):
         :param event:
         :return:
         """
-        # Get Last Line
-        document = self.console.document()
-        line_index = document.lineCount()
-        raw_last_line = document.findBlockByLineNumber(line_index - 1).text()
-
-        text = ''
-        current_hook = ''
-        # Exclude first 6 chars: (Pdb)\s
-        if raw_last_line:
-            for hook in self.HOOKS:
-                if raw_last_line.startswith(hook):
-                    current_hook = hook
-                    text = raw_last_line[len(hook):]
-                    break
-            else:
-                text = raw_last_line
+        # Get Input Line: everything between the input anchor and the end of the document
+        current_hook = self._input_hook
+        anchor_position = self._input_anchor.position()
+        input_cursor = QtGui.QTextCursor(self.console.document())
+        input_cursor.setPosition(anchor_position)
+        input_cursor.movePosition(QtGui.QTextCursor.MoveOperation.End, QtGui.QTextCursor.MoveMode.KeepAnchor)
+        text = input_cursor.selectedText()
 
         # Get Cursor position
-        line_from_zero = line_index - 1
-        current_cursor_line = self.console.textCursor().blockNumber()
-        current_cursor_column = self.console.textCursor().columnNumber()
+        cursor = self.console.textCursor()
+        current_cursor_position = min(cursor.position(), cursor.anchor())
 
         # If Enter was pressed -> Process Expression
-        if event.key() == QtCore.Qt.Key.Key_Return and text:
+        if event.key() == QtCore.Qt.Key.Key_Return and (text or current_hook == self.HOOK_LINE_BREAK):
+            self.history.add(text)
+
             # Consider Custom Clear Screen Command
             if text == 'cls':
-                self.__clear_screen(raw_last_line)
+                self.__clear_screen(current_hook)
                 return
 
-            # Replace Line Break with Enter
-            if self.HOOK_LINE_BREAK == text:
-                text = '\r\n'
-            elif self.HOOK_LINE_BREAK in text:
-                # Replace Line Break with tab
-                text = text.replace(self.HOOK_LINE_BREAK, '\t')
-                current_hook = self.HOOK_LINE_BREAK
+            # Consider Profiling/Memory/Threads Commands at pdb prompt, handled without resuming pdb
+            report = self.tools.run(text) if current_hook == self.HOOK_HEADER else None
+            if report is not None:
+                self.__write_report(report, current_hook)
+                return
 
-            self.__reset_buffer()
-            self.buffer.write(text)
-            self.__set_enable_gui(False)
+            if current_hook == self.HOOK_LINE_BREAK:
+                # Replace Line Break with Enter (empty line) or tab
+                text = '\t' + text if text else '\r\n'
+
+            self.__submit(text)
 
         # If User want to delete something and there is no value in buffer -> Reject
-        if event.key() == QtCore.Qt.Key.Key_Backspace or event.key() == QtCore.Qt.Key.Key_Delete:
-            if current_cursor_line != line_from_zero or current_cursor_column <= len(current_hook):
+        if event.key() == QtCore.Qt.Key.Key_Backspace:
+            if current_cursor_position <= anchor_position:
+                return
+        if event.key() == QtCore.Qt.Key.Key_Delete:
+            if current_cursor_position < anchor_position:
+                return
+
+        # Browse History, replacing the input line
+        if event.key() in (QtCore.Qt.Key.Key_Up, QtCore.Qt.Key.Key_Down) and current_cursor_position >= anchor_position:
+            if event.key() == QtCore.Qt.Key.Key_Up:
+                entry = self.history.previous()
+            else:
+                entry = self.history.next()
+            if entry is not None:
+                input_cursor.insertText(entry)
+                self.console.setTextCursor(input_cursor)
+            return
+
+        if event.key() == QtCore.Qt.Key.Key_Tab and current_cursor_position >= anchor_position:
+            if self.__complete(text[:current_cursor_position - anchor_position], current_hook):
                 return
 
-        if event.key() == QtCore.Qt.Key.Key_Home and current_cursor_line == line_from_zero:
+        if event.key() == QtCore.Qt.Key.Key_Home and current_cursor_position >= anchor_position:
             if text:
                 temp_cursor = self.console.textCursor()
-                temp_cursor.movePosition(
-                    QtGui.QTextCursor.MoveOperation.StartOfLine,
-                    QtGui.QTextCursor.MoveMode.MoveAnchor
-                )
-                temp_cursor.movePosition(
-                    QtGui.QTextCursor.MoveOperation.Right,
-                    QtGui.QTextCursor.MoveMode.MoveAnchor,
-                    len(current_hook)
-                )
+                temp_cursor.setPosition(anchor_position)
                 self.console.setTextCursor(temp_cursor)
             return
 
-        # Set Console Text to Black
-        self.console.setTextColor(QtCore.Qt.GlobalColor.black)
         # Execute default method
-        QtWidgets.QTextEdit.keyPressEvent(self.console, event)
+        QtWidgets.QPlainTextEdit.keyPressEvent(self.console, event)
+
+    def __complete(self, line, current_hook):
+        """
+        Complete name before cursor, list candidates when completion is ambiguous
+        :param line: input line up to the cursor
+        :param current_hook:
+        :return: False if there is nothing to complete, Tab is then inserted
+        """
+        session = self._sessions.get(self.session_selector.currentData())
+        if session is None:
+            return False
+        token, matches = self.completer.complete(line, session.frame, session.frame_locals, session.debugger)
+        if not token:
+            return False
+
+        prefix = common_prefix(matches)
+        if len(prefix) > len(token):
+            self.console.textCursor().insertText(prefix[len(token):])
+        elif len(matches) > 1:
+            # Print candidates, then prompt again with the same input
+            text = self.__input_text()
+            self.__write_report('  '.join(matches), current_hook)
+            self.console.textCursor().insertText(text)
+        return True
+
+    def __input_text(self):
+        cursor = QtGui.QTextCursor(self.console.document())
+        cursor.setPosition(self._input_anchor.position())
+        cursor.movePosition(QtGui.QTextCursor.MoveOperation.End, QtGui.QTextCursor.MoveMode.KeepAnchor)
+        return cursor.selectedText()
+
+    def __push_tool_button(self):
+        button_scope = self.sender().text()
+        if button_scope == 'Profile':
+            report = self.tools.toggle_profile()
+        elif button_scope == 'Memory':
+            report = self.tools.snapshot_and_diff()
+        else:
+            report = self.tools.thread_stacks()
+        self.__write_report(report, self._input_hook)
+
+    def __write_report(self, report, current_hook):
+        """
+        Print tool report and restore prompt, pdb keeps waiting for input
+        :param report:
+        :param current_hook:
+        :return:
+        """
+        cursor = self.console.textCursor()
+        cursor.movePosition(QtGui.QTextCursor.MoveOperation.End)
+        self.console.setTextCursor(cursor)
+        self.console.insertPlainText('\n' + report + '\n' + current_hook)
 
     def __push_button(self):
         # Read text from Button and use it as pdb keyword
         button_scope = self.sender().text().lower()
-        self.__reset_buffer()
-        self.buffer.write(button_scope)
-        self.__set_enable_gui(False)
-
-    def __reset_buffer(self):
-        if isinstance(self.buffer, io.StringIO):
-            # Clear Buffer
-            self.buffer.truncate(0)
-            self.buffer.seek(0)
-        else:
-            self.buffer = io.StringIO()
+        self.__submit(button_scope)
 
+    @QtCore.pyqtSlot(str)
     def __insert_plain_text(self, message):
-        # Do some stylistics
-        if message.startswith(self.HOOK_HEADER):
-            self.console.setTextColor(QtCore.Qt.GlobalColor.magenta)
-            QtWidgets.QTextEdit.insertPlainText(self.console, message)
-            return
-        elif message.startswith(self.HOOK_INTERACT):
-            self.console.setTextColor(QtCore.Qt.GlobalColor.darkMagenta)
-            QtWidgets.QTextEdit.insertPlainText(self.console, message)
-            return
-
-        if message.startswith('***'):
-            self.console.setTextColor(QtCore.Qt.GlobalColor.red)
-
-        QtWidgets.QTextEdit.insertPlainText(self.console, message)
+        # Output goes to the end, also when the cursor was moved (e.g. to a match of the find bar)
+        cursor = self.console.textCursor()
+        if cursor.hasSelection() or not cursor.atEnd():
+            cursor.movePosition(QtGui.QTextCursor.MoveOperation.End)
+            self.console.setTextCursor(cursor)
+
+        # Colours are applied by ConsoleHighlighter
+        QtWidgets.QPlainTextEdit.insertPlainText(self.console, message)
+
+        # Move Input Anchor after inserted text, remember prompt if message ended with one
+        self._input_hook = ''
+        line = message.rpartition('\n')[2]
+        if line:
+            for hook in self.HOOKS + [self.HOOK_LINE_BREAK]:
+                if line.startswith(hook):
+                    self._input_hook = hook
+                    break
+        self._input_anchor.setPosition(self.console.textCursor().position())
         # AutoScroll
         self.console.verticalScrollBar().setValue(self.console.verticalScrollBar().maximum())
 
@@ -272,6 +838,7 @@ class MyBreakPoint(QtWidgets.QDialog):
                 current_hook = hook
                 break
         self.console.clear()
+        self.console.document().setMaximumBlockCount(self.max_scrollback)
         self.console.insertPlainText(current_hook)
 
 
@@ -282,33 +849,53 @@ def get_qtconsole_object():
         return MyBreakPoint.console
 
 
-def setup_breakpoint_hook(parent, method, redirect_streams=False):
-    def __method(*args, **kwargs):
-        breakpoint()
-        return method(*args, **kwargs)
+def setup_breakpoint_hook(parent, method, redirect_streams=False, buffered_streams=False,
+                          condition=None, hit_count=None, sample_every=None, backend=BACKEND_AUTO,
+                          child_processes=False, **kwargs):
+    __method = wrap_with_breakpoint(method, condition, hit_count, sample_every, backend=backend)
 
+    # Hook set up again while a child process imports the module: parent's dialog serves it
+    if is_child_process():
+        return __method
+
+    # One dialog serves every hook, each thread hitting a breakpoint gets its own session
     if not isinstance(sys.stdin, MyBreakPoint):
-        sys.stdin = MyBreakPoint(parent)
-    else:
-        # Restore Streams
-        sys.stdin = sys.__stdin__
-        sys.stdout = sys.__stdout__
-        sys.stderr = sys.__stderr__
-        raise Exception(
-            "Multiple Instances are not allowed. Can be possible, but I'm to lazy to go deep with development."
-        )
+        # Extra kwargs are MyBreakPoint options (blocking_wait, max_scrollback, ...)
+        sys.stdin = MyBreakPoint(parent, **kwargs)
 
     if redirect_streams:
-        sys.stdin.redirect_outerr_stream()
+        sys.stdin.redirect_outerr_stream(buffered=buffered_streams)
+    if child_processes:
+        sys.stdin.serve_child_processes()
     return __method
 
 
+def setup_log_handler(parent, logger=None, level=logging.NOTSET, break_level=None, break_logger=None, **kwargs):
+    """
+    Show records of logger in the HelpUs window, records at or above break_level stop in pdb
+    :param parent:
+    :param logger:
+    :param level:
+    :param break_level: None never breaks
+    :param break_logger: only records of this logger (and children) break
+    :param kwargs: MyBreakPoint options
+    :return: LogHandler
+    """
+    if not isinstance(sys.stdin, MyBreakPoint):
+        sys.stdin = MyBreakPoint(parent, **kwargs)
+    handler = sys.stdin.attach_logging(logger, level)
+    if break_level is not None:
+        handler.add_break_rule(break_level, break_logger)
+    return handler
+
+
 if __name__ == '__main__':
     p = QtWidgets.QApplication(sys.argv)
     LOGGER.error('Ceva')
 
-    LOGGER.error = setup_breakpoint_hook(None, LOGGER.error, redirect_streams=True)
-    # LOGGER.error = setup_breakpoint_hook(None, LOGGER.error, redirect_streams=True)
+    # Records are listed under the console, errors of 'HelpUs' stop in pdb
+    setup_log_handler(None, LOGGER, break_level=logging.ERROR, break_logger='HelpUs')
+    sys.stdin.redirect_outerr_stream()
 
     x = 90
     LOGGER.error('Altceva')
@@ -0,0 +1,350 @@
+import os
+import pdb
+import sys
+import threading
+
+# Backend Names
+BACKEND_AUTO = 'auto'
+BACKEND_SETTRACE = 'settrace'
+BACKEND_MONITORING = 'monitoring'
+
+HAS_MONITORING = hasattr(sys, 'monitoring')
+
+# Code of this module runs while events are enabled (e.g. arming the next thread), it is never debugged
+_MODULE_FILE = __file__
+
+
+class _MonitoringDispatcher:
+    """
+    The one sys.monitoring DEBUGGER_ID registration shared by every MonitoringPdb.
+
+    Tool ids are few and events are process wide, so debuggers of several threads register here:
+    callbacks are sent to the debugger of the thread they happen in, and the events enabled are the
+    union of those armed by each debugger.
+    """
+    TOOL_NAME = 'helpus'
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # thread ident -> MonitoringPdb
+        self._debuggers = {}
+        # code objects with local events enabled, for any debugger
+        self._local_codes = set()
+
+    def add(self, debugger):
+        with self._lock:
+            if not self._debuggers:
+                monitoring = sys.monitoring
+                owner = monitoring.get_tool(monitoring.DEBUGGER_ID)
+                if owner is not None:
+                    raise RuntimeError('sys.monitoring debugger id is used by {}'.format(owner))
+                monitoring.use_tool_id(monitoring.DEBUGGER_ID, self.TOOL_NAME)
+                for event, callback in self.__callbacks().items():
+                    monitoring.register_callback(monitoring.DEBUGGER_ID, event, callback)
+            self._debuggers[debugger._thread_ident] = debugger
+
+    def remove(self, debugger):
+        with self._lock:
+            if self._debuggers.get(debugger._thread_ident) is not debugger:
+                return
+            del self._debuggers[debugger._thread_ident]
+            if self._debuggers:
+                self.update()
+                return
+            monitoring = sys.monitoring
+            monitoring.set_events(monitoring.DEBUGGER_ID, 0)
+            for code in self._local_codes:
+                monitoring.set_local_events(monitoring.DEBUGGER_ID, code, 0)
+            self._local_codes.clear()
+            for event in self.__callbacks():
+                monitoring.register_callback(monitoring.DEBUGGER_ID, event, None)
+            monitoring.free_tool_id(monitoring.DEBUGGER_ID)
+
+    def update(self):
+        """
+        Enable events armed by debuggers, turn off the others
+        :return:
+        """
+        monitoring = sys.monitoring
+        with self._lock:
+            codes = set().union(*(debugger._local_codes for debugger in self._debuggers.values()))
+            for code in self._local_codes - codes:
+                monitoring.set_local_events(monitoring.DEBUGGER_ID, code, 0)
+            for code in codes - self._local_codes:
+                monitoring.set_local_events(monitoring.DEBUGGER_ID, code, MonitoringPdb.LOCAL_EVENTS)
+            self._local_codes = codes
+            global_events = 0
+            for debugger in self._debuggers.values():
+                global_events |= debugger._global_events
+            monitoring.set_events(monitoring.DEBUGGER_ID, global_events)
+            # Events disabled by callbacks returning DISABLE are enabled again
+            monitoring.restart_events()
+
+    def arm_code(self, code):
+        with self._lock:
+            if code not in self._local_codes:
+                sys.monitoring.set_local_events(sys.monitoring.DEBUGGER_ID, code, MonitoringPdb.LOCAL_EVENTS)
+                self._local_codes.add(code)
+
+    def __callbacks(self):
+        events = sys.monitoring.events
+        return {
+            events.LINE: self.__on_line,
+            events.PY_START: self.__on_start,
+            events.PY_RESUME: self.__on_start,
+            events.PY_RETURN: self.__on_return,
+            events.PY_YIELD: self.__on_return,
+            events.RAISE: self.__on_raise,
+            events.PY_UNWIND: self.__on_unwind,
+        }
+
+    # ------------------------------------
+    # Callbacks, run in the thread of the event
+
+    def __on_line(self, code, line_number):
+        debugger = self._debuggers.get(threading.get_ident())
+        if debugger is not None:
+            debugger._on_line(sys._getframe(1), code)
+
+    def __on_start(self, code, instruction_offset):
+        if code.co_filename == _MODULE_FILE:
+            return sys.monitoring.DISABLE
+        debugger = self._debuggers.get(threading.get_ident())
+        if debugger is None:
+            return
+        result = debugger._on_start(sys._getframe(1), code)
+        # DISABLE applies to every thread, keep the event while other threads are debugged
+        if result is sys.monitoring.DISABLE and len(self._debuggers) > 1:
+            return
+        return result
+
+    def __on_return(self, code, instruction_offset, retval):
+        debugger = self._debuggers.get(threading.get_ident())
+        if debugger is not None:
+            debugger._on_return(sys._getframe(1), code, retval)
+
+    def __on_raise(self, code, instruction_offset, exception):
+        if code.co_filename == _MODULE_FILE:
+            return
+        debugger = self._debuggers.get(threading.get_ident())
+        if debugger is not None:
+            debugger._on_raise(sys._getframe(1), code, exception)
+
+    def __on_unwind(self, code, instruction_offset, exception):
+        if code.co_filename == _MODULE_FILE:
+            return
+        debugger = self._debuggers.get(threading.get_ident())
+        if debugger is not None:
+            debugger._on_unwind(sys._getframe(1), code, exception)
+
+
+_dispatcher = _MonitoringDispatcher()
+
+
+class MonitoringPdb(pdb.Pdb):
+    """
+    Pdb driven by sys.monitoring (Python 3.12+) instead of sys.settrace.
+
+    Only code objects being stepped get LINE/PY_RETURN/PY_YIELD events, calls are followed through
+    PY_START/PY_RESUME only while stepping or while breakpoints are set. RAISE/PY_UNWIND cannot be
+    enabled per code object, they are on while the session is armed and ignored outside stepped
+    code. 'continue' without breakpoints turns every event off, so the program runs at full speed.
+
+    Sessions of every thread share the DEBUGGER_ID tool through _MonitoringDispatcher, which sends
+    each event to the debugger of its thread.
+    """
+    LOCAL_EVENTS = HAS_MONITORING and (
+        sys.monitoring.events.LINE | sys.monitoring.events.PY_RETURN | sys.monitoring.events.PY_YIELD)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._monitoring = False
+        # Events wanted by this debugger, enabled through _dispatcher
+        self._local_codes = set()
+        self._global_events = 0
+        self._stop_frame = None
+        self._thread_ident = None
+
+    # ------------------------------------
+    # Event Control
+
+    def _start_monitoring(self):
+        if self._monitoring:
+            return
+        _dispatcher.add(self)
+        self._monitoring = True
+
+    def _stop_monitoring(self):
+        if not self._monitoring:
+            return
+        self._local_codes.clear()
+        self._global_events = 0
+        _dispatcher.remove(self)
+        self._monitoring = False
+
+    def _arm_code(self, code):
+        """
+        Enable LINE, PY_RETURN and PY_YIELD events for one code object
+        :param code:
+        :return:
+        """
+        if code not in self._local_codes:
+            self._local_codes.add(code)
+            _dispatcher.arm_code(code)
+
+    def _arm(self, frame=None, follow_calls=False):
+        """
+        Turn off every event enabled so far, then enable those needed from frame on
+        :param frame: frame whose code gets LINE/PY_RETURN/PY_YIELD events
+        :param follow_calls: enable PY_START/PY_RESUME everywhere to catch new frames
+        :return:
+        """
+        events = sys.monitoring.events
+        self._local_codes = {frame.f_code} if frame is not None else set()
+        self._global_events = events.RAISE | events.PY_UNWIND
+        if follow_calls:
+            self._global_events |= events.PY_START | events.PY_RESUME
+        # Registered once armed: events of other threads may already be on
+        self._start_monitoring()
+        _dispatcher.update()
+
+    # ------------------------------------
+    # Callbacks, called by _dispatcher for events of this debugger's thread
+
+    def _on_line(self, frame, code):
+        self.dispatch_line(frame)
+
+    def _on_start(self, frame, code):
+        if self.dispatch_call(frame, None) is None:
+            # Nothing to do in this code object until events are restarted
+            return sys.monitoring.DISABLE
+        # Stopping here may have ended the session ('continue' without breakpoints)
+        if self._monitoring:
+            self._arm_code(code)
+
+    def _on_return(self, frame, code, retval):
+        self.dispatch_return(frame, retval)
+        self._follow_caller(frame)
+
+    def _on_raise(self, frame, code, exception):
+        # Global event, only stepped code objects report exceptions, as settrace does for traced frames
+        if code in self._local_codes:
+            self.dispatch_exception(frame, (type(exception), exception, exception.__traceback__))
+
+    def _on_unwind(self, frame, code, exception):
+        if code not in self._local_codes:
+            return
+        # settrace reports a 'return' event with None when a frame is left by an exception
+        self.dispatch_return(frame, None)
+        # The caller gets RAISE next, it must be armed by then
+        self._follow_caller(frame)
+
+    def _follow_caller(self, frame):
+        """
+        Frame is left (return, yield or exception) while stepping, keep following its caller
+        :param frame:
+        :return:
+        """
+        caller = frame.f_back
+        if caller is not None and self._monitoring and (
+                self.stopframe is None or self.stopframe is caller):
+            self._arm_code(caller.f_code)
+
+    # ------------------------------------
+    # Bdb Commands
+
+    def interaction(self, frame, traceback):
+        # Frame really executing, curframe may be moved by up/down
+        self._stop_frame = frame
+        super().interaction(frame, traceback)
+
+    def set_trace(self, frame=None, **kwargs):
+        if frame is None:
+            frame = sys._getframe().f_back
+        self.reset()
+        self._thread_ident = threading.get_ident()
+        # Bottom frame, same as Bdb.set_trace, without installing f_trace
+        bottom = frame
+        while bottom.f_back is not None:
+            bottom = bottom.f_back
+        self.botframe = bottom
+        self.set_step()
+        self._arm(frame, follow_calls=True)
+
+    def set_step(self):
+        super().set_step()
+        if self._monitoring:
+            self._arm(self._stop_frame, follow_calls=True)
+
+    def set_next(self, frame):
+        super().set_next(frame)
+        self._arm(frame)
+
+    def set_until(self, frame, lineno=None):
+        super().set_until(frame, lineno)
+        self._arm(frame)
+
+    def set_return(self, frame):
+        super().set_return(frame)
+        self._arm(frame)
+
+    def set_continue(self):
+        super().set_continue()
+        if self.breaks:
+            # Only code objects from files holding breakpoints get LINE events: frames already
+            # running are armed here, new frames in _on_start
+            self._arm(follow_calls=True)
+            frame = self._stop_frame
+            while frame is not None:
+                if self.canonic(frame.f_code.co_filename) in self.breaks:
+                    self._arm_code(frame.f_code)
+                frame = frame.f_back
+        else:
+            self._stop_monitoring()
+
+    def set_quit(self):
+        super().set_quit()
+        self._stop_monitoring()
+
+
+def get_debugger_class(backend=BACKEND_AUTO):
+    """
+    :param backend: 'auto', 'monitoring' or 'settrace'
+    :return: Pdb class for backend, 'auto' prefers sys.monitoring when available
+    """
+    if backend == BACKEND_SETTRACE:
+        return pdb.Pdb
+    if backend in (BACKEND_AUTO, BACKEND_MONITORING):
+        if HAS_MONITORING:
+            return MonitoringPdb
+        if backend == BACKEND_AUTO:
+            return pdb.Pdb
+        raise RuntimeError('sys.monitoring backend requires Python 3.12+')
+    raise ValueError('Unknown debugger backend: {}'.format(backend))
+
+
+def default_hook_active():
+    """
+    :return: True if builtin breakpoint() would run pdb: sys.breakpointhook is not replaced (debugpy,
+        IDEs) and PYTHONBREAKPOINT is unset or pdb.set_trace
+    """
+    if sys.breakpointhook is not sys.__breakpointhook__:
+        return False
+    hook = '' if sys.flags.ignore_environment else os.environ.get('PYTHONBREAKPOINT', '')
+    return hook in ('', 'pdb.set_trace')
+
+
+def set_trace(frame=None, backend=BACKEND_AUTO):
+    """
+    Enter debugger at frame (caller frame by default). As builtin breakpoint() does, nothing happens
+    with PYTHONBREAKPOINT=0 and another breakpoint hook is called instead of backend when one is set
+    :param frame:
+    :param backend: None runs stock pdb, as breakpoint() would
+    :return:
+    """
+    if frame is None:
+        frame = sys._getframe().f_back
+    if not default_hook_active():
+        sys.breakpointhook()
+        return
+    get_debugger_class(BACKEND_SETTRACE if backend is None else backend)().set_trace(frame)
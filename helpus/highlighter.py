@@ -0,0 +1,142 @@
+import keyword
+import re
+
+from PyQt5 import QtCore, QtGui
+
+
+def _text_format(color, bold=False):
+    text_format = QtGui.QTextCharFormat()
+    text_format.setForeground(QtGui.QColor(color))
+    if bold:
+        text_format.setFontWeight(QtGui.QFont.Weight.Bold)
+    return text_format
+
+
+class ConsoleHighlighter(QtCore.QObject):
+    """
+    Colour console blocks: prompts, pdb errors, frame locations, and Python syntax in source echoed
+    by 'list'/'where' or typed after '>>> '.
+
+    Unlike QSyntaxHighlighter, which calls highlightBlock for every block added, only blocks on screen
+    are coloured, once per event loop pass after the editor asked for a repaint. Streaming output
+    costs no Python call per line. A block is coloured again once changed (typed input)
+    """
+    ERROR_PREFIX = '***'
+    # Block user state of coloured blocks, reset by changes
+    HIGHLIGHTED = 1
+
+    # Source line from 'list': lineno, breakpoint marker, current line marker, tab
+    LIST_LINE = re.compile(r'^\s*\d+\s*B?\s*(?:->|>>)?\t')
+    # Current line from 'where'/stop message
+    WHERE_LINE = re.compile(r'^-> ')
+    # Frame location from 'where'/stop message: > file(lineno)function()
+    FRAME_LINE = re.compile(r'^(?:  )?> \S.*\(\d+\).*\(\)')
+
+    PYTHON_SYNTAX = re.compile(
+        r'(?P<string>[rbufRBUF]{0,2}(?:\'[^\'\\]*(?:\\.[^\'\\]*)*\'?|"[^"\\]*(?:\\.[^"\\]*)*"?))'
+        r'|(?P<comment>#.*)'
+        r'|(?P<keyword>\b(?:' + '|'.join(keyword.kwlist) + r')\b)'
+        r'|(?P<number>\b\d+(?:\.\d*)?(?:[eE][+-]?\d+)?j?\b)'
+    )
+
+    def __init__(self, editor, prompts):
+        """
+
+        :param editor: QPlainTextEdit
+        :param prompts: dict of prompt -> colour
+        """
+        super().__init__(editor)
+        self.editor = editor
+        # Format ranges of the block being coloured, see setFormat
+        self._ranges = []
+        self._highlighting = False
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.highlight_visible)
+        editor.updateRequest.connect(self.__schedule)
+        editor.document().contentsChange.connect(self.__invalidate)
+
+        self.prompts = {prompt: _text_format(color) for prompt, color in prompts.items()}
+        self.error_format = _text_format(QtCore.Qt.GlobalColor.red)
+        self.frame_format = _text_format(QtCore.Qt.GlobalColor.darkBlue)
+        self.syntax_formats = {
+            'string': _text_format(QtCore.Qt.GlobalColor.darkGreen),
+            'comment': _text_format(QtCore.Qt.GlobalColor.gray),
+            'keyword': _text_format(QtCore.Qt.GlobalColor.darkBlue, bold=True),
+            'number': _text_format(QtCore.Qt.GlobalColor.darkCyan),
+        }
+
+    def __schedule(self, rect, dy):
+        if not self._timer.isActive():
+            self._timer.start(0)
+
+    def __invalidate(self, position, removed, added):
+        if self._highlighting:
+            return
+        # Inserted blocks are new, only blocks at both ends of the change may be marked coloured
+        document = self.editor.document()
+        document.findBlock(position).setUserState(-1)
+        document.findBlock(position + added).setUserState(-1)
+
+    def highlight_visible(self):
+        """
+        Colour blocks on screen which changed since they were coloured
+        :return:
+        """
+        last = self.editor.cursorForPosition(QtCore.QPoint(0, self.editor.viewport().height())).block()
+        block = self.editor.cursorForPosition(QtCore.QPoint(0, 0)).block()
+        while block.isValid() and block.blockNumber() <= last.blockNumber():
+            if block.userState() != self.HIGHLIGHTED:
+                self.highlight_block(block)
+            block = block.next()
+
+    def highlight_block(self, block):
+        self._ranges = []
+        self.highlightBlock(block.text())
+        block.layout().setFormats(self._ranges)
+        block.setUserState(self.HIGHLIGHTED)
+        # Relayout block with its formats, not a change of its text
+        self._highlighting = True
+        try:
+            self.editor.document().markContentsDirty(block.position(), block.length())
+        finally:
+            self._highlighting = False
+
+    def setFormat(self, start, length, text_format):
+        """
+        Same as QSyntaxHighlighter.setFormat, for the block being coloured
+        """
+        format_range = QtGui.QTextLayout.FormatRange()
+        format_range.start = start
+        format_range.length = length
+        format_range.format = text_format
+        self._ranges.append(format_range)
+
+    def highlightBlock(self, text):
+        if text.startswith(self.ERROR_PREFIX):
+            self.setFormat(0, len(text), self.error_format)
+            return
+
+        for prompt, prompt_format in self.prompts.items():
+            if text.startswith(prompt):
+                self.setFormat(0, len(prompt), prompt_format)
+                self.highlight_python(text, len(prompt))
+                return
+
+        if self.FRAME_LINE.match(text):
+            self.setFormat(0, len(text), self.frame_format)
+            return
+
+        match = self.LIST_LINE.match(text) or self.WHERE_LINE.match(text)
+        if match:
+            self.highlight_python(text, match.end())
+
+    def highlight_python(self, text, start=0):
+        """
+        Apply Python token formats to text[start:]
+        :param text:
+        :param start:
+        :return:
+        """
+        for match in self.PYTHON_SYNTAX.finditer(text, start):
+            self.setFormat(match.start(), match.end() - match.start(), self.syntax_formats[match.lastgroup])
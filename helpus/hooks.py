@@ -0,0 +1,116 @@
+import functools
+import sys
+
+from .broker import connect_to_broker
+from .debugger import BACKEND_AUTO, set_trace
+from .snapshot import capture
+
+
+class HookControl:
+    """
+    Runtime switches of a breakpoint hook, available as 'hook' attribute on the wrapped method
+    """
+    __slots__ = ('enabled', 'condition', 'hit_count', 'sample_every', 'hits')
+
+    def __init__(self, condition=None, hit_count=None, sample_every=None, enabled=True):
+        """
+
+        :param condition: callable(*args, **kwargs) -> bool, only matching calls are counted
+        :param hit_count: break on the hit_count-th matching call only, until reset
+        :param sample_every: break on 1 of every sample_every matching calls, counted from the
+            hit_count-th one if both are set
+        :param enabled:
+        """
+        self.enabled = enabled
+        self.condition = condition
+        self.hit_count = hit_count
+        self.sample_every = sample_every
+        self.hits = 0
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        self.hits = 0
+
+    def should_break(self, args, kwargs):
+        """
+
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        if self.condition is not None and not self.condition(*args, **kwargs):
+            return False
+        self.hits += 1
+        if self.hit_count is None:
+            return self.sample_every is None or not self.hits % self.sample_every
+        if self.sample_every is None:
+            return self.hits == self.hit_count
+        return self.hits >= self.hit_count and not (self.hits - self.hit_count) % self.sample_every
+
+
+def wrap_with_breakpoint(method, condition=None, hit_count=None, sample_every=None, enabled=True,
+                         backend=BACKEND_AUTO):
+    """
+    Wrap method so calls enter pdb according to HookControl rules
+    :param method:
+    :param condition:
+    :param hit_count:
+    :param sample_every:
+    :param enabled:
+    :param backend: debugger backend, see debugger.get_debugger_class. None runs stock pdb, as breakpoint() would
+    :return:
+    """
+    control = HookControl(condition, hit_count, sample_every, enabled)
+
+    # Same name as method: a module level hook replacing it can be pickled, e.g. for spawned workers
+    @functools.wraps(method)
+    def __method(*args, **kwargs):
+        # Disabled hook costs one attribute lookup
+        if control.enabled and control.should_break(args, kwargs):
+            # Child processes reach the parent's console only once they break
+            connect_to_broker()
+            # PYTHONBREAKPOINT and other debuggers' hooks take precedence over backend, see set_trace
+            set_trace(sys._getframe(), backend)
+        return method(*args, **kwargs)
+
+    __method.hook = control
+    return __method
+
+
+def wrap_with_snapshot(method, directory, condition=None, hit_count=None, sample_every=None, enabled=True,
+                       on_exception=True, limits=None):
+    """
+    Wrap method so calls matching HookControl rules capture a snapshot of the stack and continue,
+    see snapshot.SnapshotBrowser to inspect it later
+    :param method:
+    :param directory: snapshots are written here
+    :param condition:
+    :param hit_count:
+    :param sample_every:
+    :param enabled:
+    :param on_exception: also capture exceptions raised by method, they are raised again
+    :param limits: snapshot.SnapshotLimits
+    :return:
+    """
+    control = HookControl(condition, hit_count, sample_every, enabled)
+
+    @functools.wraps(method)
+    def __method(*args, **kwargs):
+        if control.enabled and control.should_break(args, kwargs):
+            capture(directory, sys._getframe(), limits=limits)
+        if not on_exception:
+            return method(*args, **kwargs)
+        try:
+            return method(*args, **kwargs)
+        except Exception as e:
+            if control.enabled:
+                capture(directory, tb=e.__traceback__, exception=e, reason='exception', limits=limits)
+            raise
+
+    __method.hook = control
+    return __method
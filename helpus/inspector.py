@@ -0,0 +1,217 @@
+import collections.abc
+
+from PyQt5 import QtCore, QtWidgets
+from .snapshot import BoundedRepr
+
+# Children fetched per expansion/scroll step
+PAGE_SIZE = 100
+
+# Huge containers are summarised by their first items, without sorting or building their full repr
+_REPR = BoundedRepr()
+_REPR.maxstring = 120
+_REPR.maxother = 120
+_REPR.maxlevel = 2
+
+
+def short_repr(value):
+    try:
+        return _REPR.repr(value)
+    except Exception as e:
+        return '<repr failed: {}>'.format(type(e).__name__)
+
+
+class _Node:
+    """
+    Tree item, children are pulled from an iterator one page at a time
+    """
+    __slots__ = ('name', 'value', 'parent', 'row', 'children', '_source', '_repr')
+
+    def __init__(self, name, value, parent=None, row=0):
+        self.name = name
+        self.value = value
+        self.parent = parent
+        self.row = row
+        self.children = []
+        self._source = None
+        self._repr = None
+
+    @property
+    def text(self):
+        # Computed when the row is painted, then cached
+        if self._repr is None:
+            self._repr = short_repr(self.value)
+        return self._repr
+
+    @property
+    def type_name(self):
+        name = type(self.value).__name__
+        if isinstance(self.value, collections.abc.Sized) and not isinstance(self.value, (str, bytes)):
+            try:
+                return '{}[{}]'.format(name, len(self.value))
+            except Exception:
+                pass
+        return name
+
+    def has_children(self):
+        value = self.value
+        if isinstance(value, (str, bytes, bytearray, int, float, complex, bool, type(None))):
+            return False
+        if isinstance(value, (collections.abc.Mapping, collections.abc.Collection)):
+            try:
+                return len(value) > 0
+            except Exception:
+                return False
+        return bool(getattr(value, '__dict__', None))
+
+    def iter_children(self):
+        value = self.value
+        if isinstance(value, collections.abc.Mapping):
+            return ((short_repr(key), item) for key, item in value.items())
+        if isinstance(value, collections.abc.Collection):
+            return (('[{}]'.format(index), item) for index, item in enumerate(value))
+        return iter(getattr(value, '__dict__', {}).items())
+
+    def can_fetch_more(self):
+        if self._source is None:
+            return self.has_children()
+        return self._source is not False
+
+    def fetch(self, count=PAGE_SIZE):
+        """
+        :param count:
+        :return: list of new children
+        """
+        if self._source is None:
+            self._source = self.iter_children()
+        if self._source is False:
+            return []
+        page = []
+        try:
+            for _ in range(count):
+                name, value = next(self._source)
+                page.append(_Node(name, value, self, len(self.children) + len(page)))
+        except StopIteration:
+            self._source = False
+        except RuntimeError:
+            # Container changed size while the program was running
+            self._source = False
+        return page
+
+
+class _NamespaceNode(_Node):
+    """
+    Locals/Globals item, children are variables listed by their plain name
+    """
+    __slots__ = ()
+
+    def iter_children(self):
+        return iter(self.value.items())
+
+
+class VariableTreeModel(QtCore.QAbstractItemModel):
+    """
+    Lazy model of name -> value pairs. Children are fetched on demand in pages of PAGE_SIZE and
+    reprs are truncated and computed only for rows the view asks data for
+    """
+    COLUMNS = ['Name', 'Type', 'Value']
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._root = _Node('', {})
+
+    def set_namespaces(self, namespaces):
+        """
+        :param namespaces: dict of title -> dict, e.g. {'Locals': ..., 'Globals': ...}
+        :return:
+        """
+        self.beginResetModel()
+        self._root = _Node('', None)
+        self._root._source = False
+        self._root.children = [
+            _NamespaceNode(title, namespace, self._root, row) for row, (title, namespace) in enumerate(namespaces.items())
+        ]
+        self.endResetModel()
+
+    def _node(self, index):
+        return index.internalPointer() if index.isValid() else self._root
+
+    def index(self, row, column, parent=QtCore.QModelIndex()):
+        node = self._node(parent)
+        if row < 0 or row >= len(node.children):
+            return QtCore.QModelIndex()
+        return self.createIndex(row, column, node.children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QtCore.QModelIndex()
+        node = index.internalPointer().parent
+        if node is None or node is self._root:
+            return QtCore.QModelIndex()
+        return self.createIndex(node.row, 0, node)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self._node(parent).children)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return len(self.COLUMNS)
+
+    def hasChildren(self, parent=QtCore.QModelIndex()):
+        node = self._node(parent)
+        return bool(node.children) or node.can_fetch_more()
+
+    def canFetchMore(self, parent):
+        return self._node(parent).can_fetch_more()
+
+    def fetchMore(self, parent):
+        node = self._node(parent)
+        page = node.fetch()
+        if not page:
+            return
+        self.beginInsertRows(parent, len(node.children), len(node.children) + len(page) - 1)
+        node.children.extend(page)
+        self.endInsertRows()
+
+    def data(self, index, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role not in (QtCore.Qt.ItemDataRole.DisplayRole, QtCore.Qt.ItemDataRole.ToolTipRole):
+            return None
+        node = index.internalPointer()
+        column = index.column()
+        if column == 0:
+            return node.name
+        if column == 1:
+            return node.type_name
+        return node.text
+
+    def headerData(self, section, orientation, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        if orientation == QtCore.Qt.Orientation.Horizontal and role == QtCore.Qt.ItemDataRole.DisplayRole:
+            return self.COLUMNS[section]
+        return None
+
+
+class VariableInspector(QtWidgets.QTreeView):
+    """
+    Locals/Globals tree of the frame pdb is stopped in
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setModel(VariableTreeModel(self))
+        self.setUniformRowHeights(True)
+        self.setAlternatingRowColors(True)
+
+    def set_frame(self, frame, frame_locals=None):
+        """
+        :param frame:
+        :param frame_locals: locals as seen by pdb (Pdb.curframe_locals), frame.f_locals by default
+        :return:
+        """
+        if frame is None:
+            self.model().set_namespaces({})
+            return
+        self.model().set_namespaces({
+            'Locals': frame.f_locals if frame_locals is None else frame_locals,
+            'Globals': frame.f_globals,
+        })
+        self.expand(self.model().index(0, 0))
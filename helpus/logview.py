@@ -0,0 +1,366 @@
+import array
+import bisect
+import collections.abc
+import logging
+import numbers
+import re
+import sys
+import threading
+import time
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+from .debugger import BACKEND_AUTO, set_trace
+
+# Records kept by default, older ones are overwritten
+LOG_CAPACITY = 100000
+# How often the view picks up new records
+REFRESH_INTERVAL = 100  # ms
+
+LEVEL_COLORS = {
+    logging.WARNING: QtCore.Qt.GlobalColor.darkYellow,
+    logging.ERROR: QtCore.Qt.GlobalColor.red,
+    logging.CRITICAL: QtCore.Qt.GlobalColor.darkRed,
+}
+
+
+# Log arguments stored as they are, others are stored as text taken when the record is logged
+SCALAR_TYPES = (str, bytes, numbers.Number, type(None))
+# %r conversion, the repr of arguments is only taken for messages using one
+REPR_SPEC = re.compile(r'%(?:\([^)]*\))?[-#0 +]*(?:\*|\d+)?(?:\.(?:\*|\d+))?r')
+
+
+class _ArgText:
+    """
+    Text of a log argument when it was logged, formatted by %s and %r like the argument itself
+    """
+    __slots__ = ('text', 'representation')
+
+    def __init__(self, value, with_repr):
+        self.text = str(value)
+        self.representation = repr(value) if with_repr else self.text
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return self.representation
+
+
+def snapshot_args(msg, args):
+    """
+    :param msg: record message, repr of arguments is only taken if it uses %r
+    :param args: record args, tuple or mapping
+    :return: args with values other than immutable scalars replaced by their text, so records do
+        not keep objects alive nor show them as they are when the row is painted
+    """
+    mapping = isinstance(args, collections.abc.Mapping)
+    # Tuples of scalars are immutable and stored as they are, mappings are always copied
+    if not mapping and all(isinstance(value, SCALAR_TYPES) for value in args):
+        return args
+    with_repr = REPR_SPEC.search(str(msg)) is not None
+    if mapping:
+        return {
+            key: value if isinstance(value, SCALAR_TYPES) else _ArgText(value, with_repr)
+            for key, value in args.items()
+        }
+    return tuple(value if isinstance(value, SCALAR_TYPES) else _ArgText(value, with_repr) for value in args)
+
+
+class LogBuffer:
+    """
+    Ring buffer of log records stored column by column: time, level and logger id live in typed
+    arrays, messages are kept unformatted until a row is shown. Arguments other than immutable scalars
+    are stored as text (see snapshot_args). Records are numbered by a sequence number which keeps
+    growing when old records are overwritten
+    """
+
+    def __init__(self, capacity=LOG_CAPACITY):
+        self.capacity = capacity
+        self.times = array.array('d', bytes(8 * capacity))
+        self.levels = array.array('H', bytes(2 * capacity))
+        self.logger_ids = array.array('I', bytes(4 * capacity))
+        self.messages = [None] * capacity
+        # Logger names are stored once, records keep their index
+        self.logger_names = []
+        self._logger_index = {}
+        self.total = 0
+        self._lock = threading.Lock()
+
+    @property
+    def first(self):
+        """
+        :return: sequence number of the oldest record still stored
+        """
+        return max(self.total - self.capacity, 0)
+
+    def append(self, record):
+        """
+        Safe to call from any thread
+        :param record: logging.LogRecord
+        :return: sequence number of record
+        """
+        exc_text = None
+        if record.exc_info:
+            # Tracebacks keep frames alive, format them now
+            exc_text = logging.Formatter().formatException(record.exc_info)
+        args = snapshot_args(record.msg, record.args) if record.args else record.args
+        with self._lock:
+            logger_id = self._logger_index.get(record.name)
+            if logger_id is None:
+                logger_id = self._logger_index[record.name] = len(self.logger_names)
+                self.logger_names.append(record.name)
+            sequence = self.total
+            position = sequence % self.capacity
+            self.times[position] = record.created
+            self.levels[position] = record.levelno
+            self.logger_ids[position] = logger_id
+            self.messages[position] = (record.msg, args, exc_text)
+            self.total = sequence + 1
+        return sequence
+
+    def level(self, sequence):
+        return self.levels[sequence % self.capacity]
+
+    def logger_name(self, sequence):
+        return self.logger_names[self.logger_ids[sequence % self.capacity]]
+
+    def created(self, sequence):
+        return self.times[sequence % self.capacity]
+
+    def message(self, sequence):
+        """
+        :param sequence:
+        :return: formatted message, formatted each time it is asked for
+        """
+        msg, args, exc_text = self.messages[sequence % self.capacity]
+        try:
+            text = str(msg) % args if args else str(msg)
+        except Exception:
+            text = '{} {}'.format(msg, args)
+        return text + '\n' + exc_text if exc_text else text
+
+    def match(self, start, end, min_level=logging.NOTSET, logger=''):
+        """
+        :param start: first sequence number
+        :param end: sequence number after the last one
+        :param min_level:
+        :param logger: logger name, its children match too
+        :return: array of matching sequence numbers
+        """
+        start = max(start, self.first)
+        logger_ids = None
+        if logger:
+            logger_ids = {
+                index for index, name in enumerate(self.logger_names)
+                if name == logger or name.startswith(logger + '.')
+            }
+        levels, ids, capacity = self.levels, self.logger_ids, self.capacity
+        return array.array('Q', [
+            sequence for sequence in range(start, end)
+            if levels[sequence % capacity] >= min_level
+            and (logger_ids is None or ids[sequence % capacity] in logger_ids)
+        ])
+
+
+class BreakRule:
+    """
+    Break into pdb on records at or above level, from logger or its children (any logger if None)
+    """
+    __slots__ = ('level', 'logger')
+
+    def __init__(self, level=logging.ERROR, logger=None):
+        self.level = level if isinstance(level, int) else logging.getLevelName(level)
+        self.logger = logger
+
+    def matches(self, record):
+        if record.levelno < self.level:
+            return False
+        return self.logger is None or record.name == self.logger or record.name.startswith(self.logger + '.')
+
+
+class LogHandler(logging.Handler):
+    """
+    Keeps records in a LogBuffer instead of formatting them, records matching a BreakRule stop the
+    logging call in pdb
+    """
+
+    def __init__(self, level=logging.NOTSET, capacity=LOG_CAPACITY, backend=BACKEND_AUTO):
+        super().__init__(level)
+        self.buffer = LogBuffer(capacity)
+        self.break_rules = []
+        self.backend = backend
+
+    def add_break_rule(self, level=logging.ERROR, logger=None):
+        """
+        :param level: level number or name
+        :param logger:
+        :return: BreakRule, remove it from break_rules to stop breaking
+        """
+        rule = BreakRule(level, logger)
+        self.break_rules.append(rule)
+        return rule
+
+    def handle(self, record):
+        # Buffer has its own lock, handler lock is not held while pdb waits for input
+        if not self.filter(record):
+            return False
+        self.emit(record)
+        if self.break_rules and any(rule.matches(record) for rule in self.break_rules):
+            set_trace(self._caller_frame(), self.backend)
+        return True
+
+    def emit(self, record):
+        try:
+            self.buffer.append(record)
+        except Exception:
+            self.handleError(record)
+
+    @staticmethod
+    def _caller_frame():
+        """
+        :return: frame which called the logger, outside of logging and this module
+        """
+        frame = sys._getframe(1)
+        while frame.f_back is not None and frame.f_globals.get('__name__') in ('logging', __name__):
+            frame = frame.f_back
+        return frame
+
+
+class LogTableModel(QtCore.QAbstractTableModel):
+    """
+    Rows are sequence numbers of records passing the filter; cells are formatted when painted.
+    refresh() only scans records added since the last call
+    """
+    COLUMNS = ['Time', 'Level', 'Logger', 'Message']
+
+    def __init__(self, buffer, parent=None):
+        super().__init__(parent)
+        self.buffer = buffer
+        self.min_level = logging.NOTSET
+        self.logger = ''
+        self._rows = array.array('Q')
+        self._end = buffer.first
+
+    def set_filter(self, min_level=None, logger=None):
+        """
+        :param min_level:
+        :param logger: logger name, its children match too
+        :return:
+        """
+        if min_level is not None:
+            self.min_level = min_level
+        if logger is not None:
+            self.logger = logger
+        self.beginResetModel()
+        self._end = self.buffer.total
+        self._rows = self.buffer.match(self.buffer.first, self._end, self.min_level, self.logger)
+        self.endResetModel()
+
+    def refresh(self):
+        """
+        Drop rows overwritten in the buffer, append new matching records
+        :return:
+        """
+        total = self.buffer.total
+        if total == self._end:
+            return
+        expired = bisect.bisect_left(self._rows, self.buffer.first)
+        if expired:
+            self.beginRemoveRows(QtCore.QModelIndex(), 0, expired - 1)
+            del self._rows[:expired]
+            self.endRemoveRows()
+        rows = self.buffer.match(self._end, total, self.min_level, self.logger)
+        self._end = total
+        if rows:
+            self.beginInsertRows(QtCore.QModelIndex(), len(self._rows), len(self._rows) + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
+
+    def sequence(self, row):
+        return self._rows[row]
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return len(self.COLUMNS)
+
+    def data(self, index, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        sequence = self._rows[index.row()]
+        if sequence < self.buffer.first:
+            # Overwritten since last refresh
+            return None
+        column = index.column()
+        if role == QtCore.Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                created = self.buffer.created(sequence)
+                return '{}.{:03d}'.format(time.strftime('%H:%M:%S', time.localtime(created)), int(created % 1 * 1000))
+            if column == 1:
+                return logging.getLevelName(self.buffer.level(sequence))
+            if column == 2:
+                return self.buffer.logger_name(sequence)
+            return self.buffer.message(sequence)
+        if role == QtCore.Qt.ItemDataRole.ForegroundRole:
+            color = LEVEL_COLORS.get(self.buffer.level(sequence))
+            return QtGui.QBrush(color) if color is not None else None
+        return None
+
+    def headerData(self, section, orientation, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        if orientation == QtCore.Qt.Orientation.Horizontal and role == QtCore.Qt.ItemDataRole.DisplayRole:
+            return self.COLUMNS[section]
+        return None
+
+
+class LogView(QtWidgets.QWidget):
+    """
+    Filterable table of a LogHandler's records, new records are picked up every REFRESH_INTERVAL
+    """
+    LEVELS = ['NOTSET', 'DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']
+
+    def __init__(self, handler, parent=None):
+        super().__init__(parent)
+        self.handler = handler
+        self.model = LogTableModel(handler.buffer, self)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        # Create Filters
+        filters = QtWidgets.QHBoxLayout()
+        self.level_selector = QtWidgets.QComboBox()
+        self.level_selector.addItems(self.LEVELS)
+        self.level_selector.currentTextChanged.connect(
+            lambda text: self.model.set_filter(min_level=logging.getLevelName(text))
+        )
+        self.logger_filter = QtWidgets.QLineEdit()
+        self.logger_filter.setPlaceholderText('Logger')
+        self.logger_filter.textChanged.connect(lambda text: self.model.set_filter(logger=text.strip()))
+        filters.addWidget(self.level_selector)
+        filters.addWidget(self.logger_filter)
+        layout.addLayout(filters)
+
+        # Create Table, fixed row height lets Qt lay out visible rows only
+        self.table = QtWidgets.QTableView()
+        self.table.setModel(self.model)
+        self.table.setWordWrap(False)
+        self.table.verticalHeader().hide()
+        self.table.verticalHeader().setSectionResizeMode(QtWidgets.QHeaderView.ResizeMode.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(self.table.fontMetrics().height() + 4)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectionBehavior.SelectRows)
+        layout.addWidget(self.table)
+
+        self.model.set_filter()
+        self._refresh_timer = QtCore.QTimer(self)
+        self._refresh_timer.timeout.connect(self.refresh)
+        self._refresh_timer.start(REFRESH_INTERVAL)
+
+    def refresh(self):
+        scroll_bar = self.table.verticalScrollBar()
+        follow = scroll_bar.value() == scroll_bar.maximum()
+        self.model.refresh()
+        # Keep following new records unless user scrolled up
+        if follow:
+            self.table.scrollToBottom()
@@ -0,0 +1,262 @@
+import atexit
+import mmap
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+
+from PyQt5 import QtWidgets
+from .highlighter import ConsoleHighlighter
+
+# Record Tags
+STDOUT = 0
+STDERR = 1
+PROMPT = 2
+INPUT = 3
+TAG_NAMES = {STDOUT: 'stdout', STDERR: 'stderr', PROMPT: 'prompt', INPUT: 'input'}
+
+# File starts with MAGIC, followed by records: timestamp (double), tag (byte), size (uint32), utf-8 text
+MAGIC = b'HELPUS-REC-1\n'
+HEADER = struct.Struct('<dBI')
+
+# Records shown per viewer page
+PAGE_SIZE = 500
+WRITE_BUFFER_SIZE = 256 * 1024
+
+
+class SessionRecorder:
+    """
+    Appends tagged, timestamped console I/O to a file. record() only queues the text, encoding and
+    writing happen in a daemon thread, which flushes whenever the queue runs empty. Texts queued
+    back to back with the same tag share one record, stamped with the time of the first
+    """
+    _STOP = object()
+
+    def __init__(self, path):
+        self.path = path
+        self._queue = queue.SimpleQueue()
+        new_file = not os.path.exists(path) or not os.path.getsize(path)
+        self._file = open(path, 'ab', buffering=WRITE_BUFFER_SIZE)
+        if new_file:
+            self._file.write(MAGIC)
+        self._thread = threading.Thread(target=self._write_records, name='HelpUs Recorder', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, tag, text):
+        """
+        Safe to call from any thread
+        :param tag: STDOUT, STDERR, PROMPT or INPUT
+        :param text:
+        :return:
+        """
+        if text:
+            self._queue.put((time.time(), tag, text))
+
+    def _write_records(self):
+        while True:
+            # Drain queue, consecutive texts of the same tag are merged into one record
+            item = self._queue.get()
+            timestamp, tag, parts = None, None, []
+            while item is not self._STOP:
+                if item[1] != tag:
+                    self._write(timestamp, tag, parts)
+                    timestamp, tag, parts = item[0], item[1], []
+                parts.append(item[2])
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._write(timestamp, tag, parts)
+            # Queue ran empty (or recorder stopped): records reach the disk
+            self._file.flush()
+            if item is self._STOP:
+                return
+
+    def _write(self, timestamp, tag, parts):
+        if not parts:
+            return
+        data = ''.join(parts).encode('utf-8', 'replace')
+        self._file.write(HEADER.pack(timestamp, tag, len(data)))
+        self._file.write(data)
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._queue.put(self._STOP)
+        self._thread.join()
+        self._thread = None
+        self._file.close()
+        atexit.unregister(self.close)
+
+
+class RecordingReader:
+    """
+    Memory mapped view of a recording. Only the offset of every PAGE_SIZE-th record is kept, so
+    memory does not grow with the recording; pages are decoded when asked for
+    """
+
+    def __init__(self, path, page_size=PAGE_SIZE):
+        self.path = path
+        self.page_size = page_size
+        self._file = open(path, 'rb')
+        self._map = None
+        self._page_offsets = []
+        # Scan position: next record offset and number of records before it
+        self._end = len(MAGIC)
+        self._count = 0
+        self.refresh()
+
+    def refresh(self):
+        """
+        Index records appended since last call, recordings can be read while being written
+        :return: number of pages
+        """
+        size = os.fstat(self._file.fileno()).st_size
+        if size <= len(MAGIC):
+            return 0
+        if self._map is None or len(self._map) != size:
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self._map[:len(MAGIC)] != MAGIC:
+                raise ValueError('Not a HelpUs recording: {}'.format(self.path))
+        offset, count = self._end, self._count
+        while offset + HEADER.size <= size:
+            _, _, length = HEADER.unpack_from(self._map, offset)
+            if offset + HEADER.size + length > size:
+                # Record still being written
+                break
+            if count % self.page_size == 0:
+                self._page_offsets.append(offset)
+            offset += HEADER.size + length
+            count += 1
+        self._end, self._count = offset, count
+        return self.page_count
+
+    @property
+    def page_count(self):
+        return len(self._page_offsets)
+
+    @property
+    def record_count(self):
+        return self._count
+
+    def page(self, index):
+        """
+        :param index:
+        :return: list of (timestamp, tag, text)
+        """
+        offset = self._page_offsets[index]
+        records = []
+        for _ in range(self.page_size):
+            if offset >= self._end:
+                break
+            timestamp, tag, length = HEADER.unpack_from(self._map, offset)
+            start = offset + HEADER.size
+            records.append((timestamp, tag, self._map[start:start + length].decode('utf-8', 'replace')))
+            offset = start + length
+        return records
+
+    def __iter__(self):
+        for index in range(self.page_count):
+            yield from self.page(index)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+def render_records(records):
+    """
+    Console text of records, as it looked in MyBreakPoint. Prompt records hold the prompt pdb wrote
+    before waiting for the input record following it
+    :param records:
+    :return:
+    """
+    parts = []
+    for _, tag, text in records:
+        if tag == INPUT:
+            parts.append(text + '\n')
+        else:
+            parts.append(text)
+    return ''.join(parts)
+
+
+class RecordingViewer(QtWidgets.QWidget):
+    """
+    Page by page view of a recording, only the shown page is decoded
+    """
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        # Import here, core imports this module
+        from .core import MyBreakPoint
+
+        self.reader = RecordingReader(path)
+        self.setWindowTitle('HelpUs Recording - {}'.format(os.path.basename(path)))
+        self.setWindowIcon(MyBreakPoint.get_icon())
+        self.resize(700, 450)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        self.console = QtWidgets.QPlainTextEdit()
+        self.console.setReadOnly(True)
+        self.console.setUndoRedoEnabled(False)
+        self.highlighter = ConsoleHighlighter(self.console, MyBreakPoint.HOOK_COLORS)
+        layout.addWidget(self.console)
+
+        # Create Page Controls
+        controls = QtWidgets.QHBoxLayout()
+        self.page_selector = QtWidgets.QSpinBox()
+        self.page_selector.valueChanged.connect(self.show_page)
+        self.page_label = QtWidgets.QLabel()
+        self.button_refresh = QtWidgets.QPushButton('Refresh')
+        self.button_refresh.clicked.connect(self.refresh)
+        controls.addWidget(QtWidgets.QLabel('Page'))
+        controls.addWidget(self.page_selector)
+        controls.addWidget(self.page_label)
+        controls.addStretch()
+        controls.addWidget(self.button_refresh)
+        layout.addLayout(controls)
+
+        self.refresh()
+        self.show_page(self.page_selector.value())
+
+    def refresh(self):
+        pages = self.reader.refresh()
+        self.page_selector.setRange(1 if pages else 0, pages)
+        self.page_label.setText('of {} ({} records)'.format(pages, self.reader.record_count))
+
+    def show_page(self, number):
+        """
+        :param number: 1 based page number
+        :return:
+        """
+        if number < 1:
+            self.console.clear()
+            return
+        records = self.reader.page(number - 1)
+        self.console.setPlainText(render_records(records))
+        if records:
+            self.setToolTip('{} - {}'.format(time.ctime(records[0][0]), time.ctime(records[-1][0])))
+
+    def closeEvent(self, event):
+        self.reader.close()
+        super().closeEvent(event)
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit('Usage: python -m helpus.recorder RECORDING')
+    app = QtWidgets.QApplication(sys.argv)
+    viewer = RecordingViewer(sys.argv[1])
+    viewer.show()
+    app.exec_()
+
+
+if __name__ == '__main__':
+    main()
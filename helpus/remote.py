@@ -0,0 +1,545 @@
+"""
+Remote attach: the debugged process serves pdb's readline/stdout/stderr over a local socket and the
+console runs in another process, so the debugged process never imports PyQt5.
+
+Debugged process:
+    from helpus.remote import setup_remote_breakpoint_hook
+    method = setup_remote_breakpoint_hook(method)
+
+Console:
+    python -m helpus.remote
+
+Addresses are 'HOST:PORT' for TCP or a file path for a Unix socket. The default is a Unix socket only
+the user can connect to. Any local user can reach a TCP port, so TCP servers require a token: one is
+generated and printed to the terminal unless given (or set in HELPUS_TOKEN), and the client passes it
+with --token.
+
+Messages are JSON lines, the connecting side sends its token first:
+    connecting side:  {"type": "hello", "token": TOKEN}
+    server -> client: {"type": "output", "stream": "stdout", "data": ...}
+                      {"type": "readline", "id": THREAD_IDENT, "name": THREAD_NAME}
+    client -> server: {"type": "input", "id": THREAD_IDENT, "data": ...}
+"""
+import argparse
+import asyncio
+import atexit
+import collections
+import errno
+import hmac
+import json
+import os
+import secrets
+import socket
+import stat
+import sys
+import tempfile
+import threading
+
+from .debugger import BACKEND_AUTO
+from .hooks import wrap_with_breakpoint
+
+# Environment variable holding the token of TCP servers, for both sides
+TOKEN_ENV = 'HELPUS_TOKEN'
+# Output messages kept while no client is attached
+BACKLOG_SIZE = 1000
+# Time given to a new connection to send its token
+HANDSHAKE_TIMEOUT = 5  # s
+
+
+def default_address():
+    """
+    :return: Unix socket in a directory private to the user, localhost TCP where Unix sockets are missing
+    """
+    if not hasattr(socket, 'AF_UNIX'):
+        return '127.0.0.1:7734'
+    return os.path.join(tempfile.gettempdir(), 'helpus-{}'.format(os.getuid()), 'remote.sock')
+
+
+DEFAULT_ADDRESS = default_address()
+
+
+def private_directory(path):
+    """
+    Create directory path for the user only, or check an existing one is: in a shared temporary
+    directory another user could have created it first
+    :param path:
+    :return:
+    """
+    os.makedirs(path, 0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or stat.S_IMODE(info.st_mode) != 0o700:
+        raise PermissionError(errno.EACCES, 'not a directory private to this user (mode 0700)', path)
+
+
+def socket_in_use(path):
+    """
+    :param path: Unix socket path
+    :return: True if a server accepts connections on path
+    """
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        return False
+    finally:
+        probe.close()
+    return True
+
+
+def parse_address(address):
+    """
+    :param address: 'HOST:PORT', (host, port), Unix socket path or None
+    :return: (host, port) tuple or path
+    """
+    if address is None or isinstance(address, tuple):
+        return address
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit():
+        return host or '127.0.0.1', int(port)
+    return address
+
+
+def format_address(address):
+    """
+    :param address: (host, port) tuple or path
+    :return: address as given on the command line
+    """
+    return '{}:{}'.format(*address) if isinstance(address, tuple) else address
+
+
+def encode(message):
+    return (json.dumps(message) + '\n').encode('utf-8')
+
+
+def hello(token):
+    return {'type': 'hello', 'token': token}
+
+
+def is_hello(message, token):
+    """
+    :param message: first message of a connection
+    :param token: token expected, any is accepted if None
+    :return: True if message opens the connection with token
+    """
+    if not isinstance(message, dict) or message.get('type') != 'hello':
+        return False
+    if token is None:
+        return True
+    received = message.get('token')
+    return isinstance(received, str) and hmac.compare_digest(received.encode('utf-8'), token.encode('utf-8'))
+
+
+class RemoteStream:
+    """
+    stdout/stderr replacement sending writes to the attached client
+    """
+
+    def __init__(self, server, name):
+        self.server = server
+        self.name = name
+
+    @staticmethod
+    def fileno():
+        return -1
+
+    def flush(self):
+        pass
+
+    def write(self, msg):
+        if msg:
+            self.server.send({'type': 'output', 'stream': self.name, 'data': msg})
+        return len(msg)
+
+
+class RemoteServer:
+    """
+    stdin replacement: readline asks the attached client for a line and blocks until it answers.
+
+    The asyncio loop runs in a daemon thread started by listen(). One client is attached at a time,
+    pending readline requests are sent again when a client attaches. Clients must open the connection
+    with token, see is_hello.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, backlog_size=BACKLOG_SIZE, token=None):
+        self.address = parse_address(address)
+        self.token = token
+        self._loop = None
+        self._server = None
+        self._writer = None
+        self._backlog = collections.deque(maxlen=backlog_size)
+        self._lock = threading.Lock()
+        # Thread ident -> [ready Event, readline request, input line]
+        self._pending = {}
+        self.stdout = RemoteStream(self, 'stdout')
+        self.stderr = RemoteStream(self, 'stderr')
+
+    # ------------------------------------
+    # Server Thread
+
+    def _run_loop(self, start):
+        """
+        Run start() in a new event loop in a daemon thread, returns once it is done
+        :param start: coroutine function binding or connecting the socket
+        :return:
+        """
+        started = threading.Event()
+        errors = []
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._loop.run_until_complete(start())
+            except OSError as e:
+                errors.append(e)
+                started.set()
+                return
+            started.set()
+            self._loop.run_forever()
+
+        threading.Thread(target=run, name='HelpUs Remote', daemon=True).start()
+        started.wait()
+        if errors:
+            self._loop = None
+            raise errors[0]
+
+    def listen(self):
+        """
+        Start serving in a daemon thread, returns once the socket is bound. TCP servers get a random
+        token if none was given
+        :return: bound address
+        """
+        if self._loop is None:
+            if self.token is None and isinstance(self.address, tuple):
+                self.token = secrets.token_urlsafe(16)
+            self._run_loop(self._start)
+        return self.address
+
+    def connect(self):
+        """
+        Connect to a console listening on address instead of waiting for one, see broker. The
+        connection is opened with token
+        :return:
+        """
+        if self._loop is None:
+            self._run_loop(self._connect)
+
+    async def _start(self):
+        if isinstance(self.address, tuple):
+            self._server = await asyncio.start_server(self._accept, *self.address)
+            # Port 0 binds a free port
+            self.address = self._server.sockets[0].getsockname()[:2]
+        else:
+            directory = os.path.dirname(self.address)
+            if directory == os.path.dirname(DEFAULT_ADDRESS) or (directory and not os.path.isdir(directory)):
+                private_directory(directory)
+            # asyncio replaces an existing socket file, which would disconnect another server
+            if socket_in_use(self.address):
+                raise OSError(errno.EADDRINUSE, 'another process serves on this socket', self.address)
+            # Only this user may connect, from the moment the socket is bound
+            umask = os.umask(0o177)
+            try:
+                self._server = await asyncio.start_unix_server(self._accept, self.address)
+            finally:
+                os.umask(umask)
+
+    async def _connect(self):
+        if isinstance(self.address, tuple):
+            reader, writer = await asyncio.open_connection(*self.address)
+        else:
+            reader, writer = await asyncio.open_unix_connection(self.address)
+        writer.write(encode(hello(self.token)))
+        self._loop.create_task(self._serve(reader, writer))
+
+    async def _accept(self, reader, writer):
+        # Nothing is sent to the client before it proved it holds the token
+        try:
+            line = await asyncio.wait_for(reader.readline(), HANDSHAKE_TIMEOUT)
+            authenticated = is_hello(json.loads(line), self.token)
+        except (ConnectionError, ValueError, asyncio.TimeoutError):
+            authenticated = False
+        if not authenticated:
+            writer.close()
+            return
+        await self._serve(reader, writer)
+
+    async def _serve(self, reader, writer):
+        with self._lock:
+            if self._writer is not None:
+                writer.close()
+                return
+            self._writer = writer
+            messages = list(self._backlog) + [pending[1] for pending in self._pending.values()]
+            self._backlog.clear()
+        for message in messages:
+            writer.write(encode(message))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self._receive(json.loads(line))
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            with self._lock:
+                self._writer = None
+            writer.close()
+
+    def _receive(self, message):
+        if message.get('type') != 'input':
+            return
+        with self._lock:
+            pending = self._pending.pop(message.get('id'), None)
+        if pending is not None:
+            pending[2] = message.get('data', '')
+            pending[0].set()
+
+    def _write(self, data):
+        # Runs in loop thread
+        writer = self._writer
+        if writer is not None:
+            writer.write(data)
+
+    def send(self, message):
+        """
+        Send message to client from any thread, kept in backlog while no client is attached
+        :param message:
+        :return:
+        """
+        with self._lock:
+            if self._writer is None:
+                if message['type'] == 'output':
+                    self._backlog.append(message)
+                return
+        self._loop.call_soon_threadsafe(self._write, encode(message))
+
+    def close(self):
+        if self._loop is None:
+            return
+
+        async def stop():
+            # Runs after writes already queued by send, output is delivered before closing
+            if self._server is not None:
+                self._server.close()
+            writer = self._writer
+            if writer is not None:
+                try:
+                    await writer.drain()
+                    writer.close()
+                    await writer.wait_closed()
+                except ConnectionError:
+                    pass
+
+        asyncio.run_coroutine_threadsafe(stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+        # Wake up readers, pdb reads an empty line as EOF
+        with self._lock:
+            pending, self._pending = list(self._pending.values()), {}
+        for ready, _, _ in pending:
+            ready.set()
+
+    # ------------------------------------
+    # File Protocol
+
+    @staticmethod
+    def fileno():
+        return -1
+
+    def readline(self):
+        """
+        Ask client for a line, waits until a client attaches and answers
+        :return:
+        """
+        thread = threading.current_thread()
+        request = {'type': 'readline', 'id': thread.ident, 'name': thread.name, 'pid': os.getpid()}
+        pending = [threading.Event(), request, '']
+        with self._lock:
+            self._pending[thread.ident] = pending
+        self.send(request)
+        pending[0].wait()
+        return pending[2]
+
+    def redirect_outerr_stream(self):
+        sys.stdout = self.stdout
+        sys.stderr = self.stderr
+
+
+class RemoteClient:
+    """
+    Connection to a RemoteServer, without any GUI. Messages are read in a daemon thread and
+    handed to on_output(stream, data) and on_readline(ident, name, pid), answers go through send_input
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, on_output=None, on_readline=None, token=None):
+        self.address = parse_address(address)
+        self.token = token
+        self.on_output = on_output
+        self.on_readline = on_readline
+        self._socket = None
+        self._send_lock = threading.Lock()
+        self._thread = None
+
+    def connect(self, timeout=None):
+        family = socket.AF_INET if isinstance(self.address, tuple) else socket.AF_UNIX
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        sock.connect(self.address)
+        sock.settimeout(None)
+        sock.sendall(encode(hello(self.token)))
+        self.start(sock)
+
+    def start(self, sock, authenticate=False):
+        """
+        Read messages from a connected socket
+        :param sock:
+        :param authenticate: sock was accepted, it is closed unless its first message holds token
+        :return:
+        """
+        self._socket = sock
+        self._thread = threading.Thread(target=self._read_messages, args=(authenticate,), name='HelpUs Client',
+                                        daemon=True)
+        self._thread.start()
+
+    def _read_messages(self, authenticate):
+        try:
+            if authenticate:
+                self._socket.settimeout(HANDSHAKE_TIMEOUT)
+            with self._socket.makefile('r', encoding='utf-8') as fp_r:
+                for line in fp_r:
+                    message = json.loads(line)
+                    if authenticate:
+                        if not is_hello(message, self.token):
+                            break
+                        authenticate = False
+                        self._socket.settimeout(None)
+                    elif message['type'] == 'output' and self.on_output is not None:
+                        self.on_output(message['stream'], message['data'])
+                    elif message['type'] == 'readline' and self.on_readline is not None:
+                        self.on_readline(message['id'], message['name'], message.get('pid'))
+        except (OSError, ValueError):
+            # Closed by close(), or not a client of ours
+            pass
+        if authenticate:
+            self.close()
+
+    def send_input(self, ident, text):
+        with self._send_lock:
+            self._socket.sendall(encode({'type': 'input', 'id': ident, 'data': text}))
+
+    def wait(self):
+        """
+        Block until server closes connection
+        :return:
+        """
+        if self._thread is not None:
+            self._thread.join()
+
+    def close(self):
+        if self._socket is not None:
+            try:
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._socket.close()
+
+
+def listen(address=DEFAULT_ADDRESS, redirect_streams=True, token=None):
+    """
+    Serve pdb's input/output on address, installed as sys.stdin
+    :param address:
+    :param redirect_streams: send stdout/stderr to the client too
+    :param token: token clients must send, TOKEN_ENV by default, generated and printed for TCP if unset
+    :return: RemoteServer
+    """
+    if not isinstance(sys.stdin, RemoteServer):
+        server = RemoteServer(address, token=token or os.environ.get(TOKEN_ENV))
+        generated = server.token is None
+        server.listen()
+        if generated and server.token is not None:
+            # Terminal of the process, stderr may be sent to the client already
+            print('HelpUs: attach with python -m helpus.remote {} --token {}'.format(
+                format_address(server.address), server.token), file=sys.__stderr__)
+        # Deliver last output before the process exits
+        atexit.register(server.close)
+        sys.stdin = server
+    if redirect_streams:
+        sys.stdin.redirect_outerr_stream()
+    return sys.stdin
+
+
+def setup_remote_breakpoint_hook(method, address=DEFAULT_ADDRESS, redirect_streams=True,
+                                 condition=None, hit_count=None, sample_every=None, backend=BACKEND_AUTO,
+                                 token=None):
+    """
+    Same as core.setup_breakpoint_hook, the console attaches from another process, see listen
+    """
+    __method = wrap_with_breakpoint(method, condition, hit_count, sample_every, backend=backend)
+    listen(address, redirect_streams, token)
+    return __method
+
+
+def console_client(dialog, address=None, session_name='{name}', token=None):
+    """
+    Client showing remote output in dialog, each remote thread waiting for input becomes a session
+    :param dialog: MyBreakPoint
+    :param address:
+    :param session_name: format of session names, with name (thread) and pid fields
+    :param token:
+    :return: RemoteClient, not connected yet
+    """
+
+    def read_line(ident, name, pid):
+        # Wait for console input in a thread of its own, like a local thread stopped in pdb
+        def run():
+            try:
+                client.send_input(ident, dialog.readline())
+            except OSError:
+                # Remote process is gone
+                pass
+        threading.Thread(target=run, name=session_name.format(name=name, pid=pid), daemon=True).start()
+
+    client = RemoteClient(
+        address,
+        on_output=lambda stream, data: dialog.messageWritten.emit(data),
+        on_readline=read_line,
+        token=token,
+    )
+    return client
+
+
+def attach(address=DEFAULT_ADDRESS, token=None, **kwargs):
+    """
+    Run the console for a remote process, returns when the process closes the connection
+    :param address:
+    :param token: token printed by the remote process, TOKEN_ENV by default
+    :param kwargs: MyBreakPoint options
+    :return:
+    """
+    from PyQt5 import QtCore, QtWidgets
+    from .core import MyBreakPoint
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+    dialog = MyBreakPoint(**kwargs)
+    dialog.setWindowTitle('{} - {}'.format(dialog.windowTitle(), address))
+    client = console_client(dialog, address, token=token or os.environ.get(TOKEN_ENV))
+    client.connect()
+
+    # Quit once the debugged process is gone
+    watcher = threading.Thread(target=lambda: (client.wait(), QtCore.QMetaObject.invokeMethod(
+        app, 'quit', QtCore.Qt.ConnectionType.QueuedConnection)), daemon=True)
+    watcher.start()
+    app.exec_()
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Attach HelpUs console to a remote process')
+    parser.add_argument('address', nargs='?', default=DEFAULT_ADDRESS, help='HOST:PORT or Unix socket path')
+    parser.add_argument('--token', help='token printed by the remote process (default: ${})'.format(TOKEN_ENV))
+    args = parser.parse_args()
+    attach(args.address, args.token)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,13 @@
+import functools
+
+
+@functools.lru_cache(maxsize=None)
+def get_icon_data():
+    """
+    Decode embedded icon on first request and keep it in memory
+    :return: ico file content
+    """
+    from stringify import unstringify
+    from .resources import snake_ico
+
+    return unstringify(snake_ico)
@@ -0,0 +1,455 @@
+import array
+import bisect
+import itertools
+import re
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+# Complete lines are joined into one text per CHUNK_LINES lines, which a query scans in one call
+CHUNK_LINES = 512
+# How often matches follow new console lines while the find bar is shown
+SYNC_INTERVAL = 100  # ms
+
+
+class ScrollbackIndex:
+    """
+    Copy of the console lines (one per document block), numbered from the first line ever written so
+    numbers stay valid when old lines are evicted from the top.
+
+    Complete lines are joined into chunks together with the offset of each line, built once as lines
+    are appended; a query runs over whole chunks and maps hits back to lines by offset. Matches of
+    the active query are kept as sorted line numbers, updated as lines are replaced or evicted, so
+    navigation never rescans the lines
+    """
+
+    def __init__(self, chunk_lines=CHUNK_LINES):
+        self.chunk_lines = chunk_lines
+        self._pattern = None
+        self.clear()
+
+    def clear(self):
+        # Lines before _start are evicted, they are dropped from the list in batches
+        self._lines = ['']
+        self._start = 0
+        self.first = 0
+        # Chunks: [number of first line, joined text, offset of each line, lowercase text or None],
+        # lines before _chunked are in there
+        self._chunks = []
+        self._chunked = 0
+        self.matches = array.array('Q')
+        # Bumped whenever matches change
+        self.version = 0
+        if self._pattern is not None:
+            self.matches.extend(self._match_lines(0, ['']))
+
+    @property
+    def end(self):
+        """
+        :return: number after the last line
+        """
+        return self.first + len(self._lines) - self._start
+
+    def __len__(self):
+        return len(self._lines) - self._start
+
+    def line(self, number):
+        return self._lines[self._start + number - self.first]
+
+    # ------------------------------------
+    # Updates
+
+    def replace_from(self, number, texts):
+        """
+        Replace lines from number to the end, the last line is the one still being written
+        :param number:
+        :param texts:
+        :return:
+        """
+        del self._lines[self._start + number - self.first:]
+        self._lines.extend(texts)
+        if number < self._chunked:
+            # Line edited above the last chunk end (not expected from console output), drop chunks holding it
+            while self._chunks and self._chunks[-1][0] + len(self._chunks[-1][2]) > number:
+                self._chunks.pop()
+            self._chunked = self._chunks[-1][0] + len(self._chunks[-1][2]) if self._chunks else self.first
+        self._add_chunks()
+        if self._pattern is not None:
+            del self.matches[bisect.bisect_left(self.matches, number):]
+            self.matches.extend(self._match_lines(number, texts))
+            self.version += 1
+
+    def _add_chunks(self):
+        # Last line may still change, it is never part of a chunk
+        while self.end - 1 - self._chunked >= self.chunk_lines:
+            start = self._start + self._chunked - self.first
+            lines = self._lines[start:start + self.chunk_lines]
+            offsets = array.array('Q', itertools.accumulate((len(line) + 1 for line in lines[:-1]), initial=0))
+            self._chunks.append([self._chunked, '\n'.join(lines), offsets, None])
+            self._chunked += self.chunk_lines
+
+    def remove_head(self, chars, end=None):
+        """
+        Evict the oldest lines, holding chars characters with their line breaks
+        :param chars:
+        :param end: number of the first line which may differ from the console
+        :return: False if chars do not end on a line break before end, index is then out of sync
+        """
+        count = 0
+        lines, start = self._lines, self._start
+        limit = len(lines) - 1 if end is None else min(len(lines) - 1, start + end - self.first)
+        while chars > 0 and start + count < limit:
+            chars -= len(lines[start + count]) + 1
+            count += 1
+        if chars:
+            return False
+
+        self.first += count
+        self._start += count
+        self._chunked = max(self._chunked, self.first)
+        if self._start > len(self._lines) // 2:
+            del self._lines[:self._start]
+            self._start = 0
+        # Drop chunks of evicted lines only, the first chunk left may start before first
+        evicted = 0
+        while evicted < len(self._chunks) and self._chunks[evicted][0] + len(self._chunks[evicted][2]) <= self.first:
+            evicted += 1
+        del self._chunks[:evicted]
+        if self.matches and self.matches[0] < self.first:
+            del self.matches[:bisect.bisect_left(self.matches, self.first)]
+            self.version += 1
+        return True
+
+    # ------------------------------------
+    # Search
+
+    def search(self, query, regex=False, case_sensitive=False):
+        """
+        Make query the active one, raises re.error for an invalid regex
+        :param query: empty string clears search
+        :param regex:
+        :param case_sensitive:
+        :return: sorted numbers of matching lines
+        """
+        self.version += 1
+        if not query:
+            self._pattern = None
+            self.matches = array.array('Q')
+            return self.matches
+        flags = re.MULTILINE if case_sensitive else re.MULTILINE | re.IGNORECASE
+        self._pattern = re.compile(query if regex else re.escape(query), flags)
+
+        search, lower = self._pattern.search, False
+        if not regex and not case_sensitive:
+            # Scan lowercase copies of chunks for the lowercase query, much faster than IGNORECASE
+            search, lower = re.compile(re.escape(query.lower())).search, True
+        matches = array.array('Q')
+        for chunk in self._chunks:
+            matches.extend(self._match_chunk(chunk, search, lower))
+        matches.extend(self._match_lines(self._chunked, self._lines[self._start + self._chunked - self.first:]))
+        self.matches = matches
+        return matches
+
+    def _match_chunk(self, chunk, search, lower=False):
+        """
+        :param chunk:
+        :param search: search method of pattern to scan chunk with
+        :param lower: scan lowercase copy of chunk, made on first use
+        :return: numbers of lines in chunk holding a match, one search call per matching line
+        """
+        first_number, text, offsets, lower_text = chunk
+        if lower:
+            if lower_text is None:
+                lower_text = chunk[3] = text.lower()
+            if len(lower_text) == len(text):
+                text = lower_text
+            else:
+                # Lowercase changed lengths, offsets would not match
+                search = self._pattern.search
+        numbers = []
+        position = offsets[self.first - first_number] if first_number < self.first else 0
+        while True:
+            match = search(text, position)
+            if match is None:
+                return numbers
+            row = bisect.bisect_right(offsets, match.start()) - 1
+            line_end = offsets[row + 1] - 1 if row + 1 < len(offsets) else len(text)
+            # Regex may match across a line break, keep line only if it matches by itself
+            if match.end() <= line_end or search(text[offsets[row]:line_end]):
+                numbers.append(first_number + row)
+            if line_end >= len(text):
+                return numbers
+            position = line_end + 1
+
+    def _match_lines(self, number, texts):
+        search = self._pattern.search
+        return [number + offset for offset, text in enumerate(texts) if search(text)]
+
+    def spans(self, number):
+        """
+        :param number:
+        :return: (start, end) of every match in line
+        """
+        if self._pattern is None or not self.first <= number < self.end:
+            return []
+        return [match.span() for match in self._pattern.finditer(self.line(number)) if match.end() > match.start()]
+
+    def next_match(self, number, backward=False):
+        """
+        :param number:
+        :param backward:
+        :return: number of the next matching line after (or before) number, wrapping around
+        """
+        if not self.matches:
+            return None
+        if backward:
+            position = bisect.bisect_left(self.matches, number) - 1
+            return self.matches[position]
+        position = bisect.bisect_right(self.matches, number)
+        return self.matches[position % len(self.matches)]
+
+
+class MatchListModel(QtCore.QAbstractListModel):
+    """
+    Matching lines of a ScrollbackIndex, text is read when a row is painted
+    """
+
+    def __init__(self, scrollback, parent=None):
+        super().__init__(parent)
+        self.scrollback = scrollback
+        self._version = None
+
+    def refresh(self):
+        if self._version != self.scrollback.version:
+            self.beginResetModel()
+            self._version = self.scrollback.version
+            self.endResetModel()
+
+    def number(self, row):
+        return self.scrollback.matches[row]
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.scrollback.matches)
+
+    def data(self, index, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != QtCore.Qt.ItemDataRole.DisplayRole:
+            return None
+        number = self.scrollback.matches[index.row()]
+        if number < self.scrollback.first:
+            return None
+        return self.scrollback.line(number)
+
+
+class SearchBar(QtWidgets.QWidget):
+    """
+    Find bar of a console: plain text or regex, next/previous match and a list of matching lines
+    (Filter). The index follows the console document as text is appended, evicted or cleared
+    """
+
+    def __init__(self, console, parent=None):
+        super().__init__(parent)
+        self.console = console
+        self.index = ScrollbackIndex()
+        # Selected match: line number, start, end
+        self._current = None
+
+        # Keep Index in sync with document, from first dirty line number on
+        self._dirty = 0
+        self._sync_timer = QtCore.QTimer(self)
+        self._sync_timer.setSingleShot(True)
+        self._sync_timer.setInterval(SYNC_INTERVAL)
+        self._sync_timer.timeout.connect(self.sync)
+        # Console keeps its document, wrapping it on each change is not free
+        self.document = console.document()
+        self.document.contentsChange.connect(self.__contents_change)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        # Create Controls
+        controls = QtWidgets.QHBoxLayout()
+        self.query = QtWidgets.QLineEdit()
+        self.query.setPlaceholderText('Find')
+        self.query.textChanged.connect(self.search)
+        self.query.keyPressEvent = self.__query_key_press
+        self.regex = QtWidgets.QCheckBox('Regex')
+        self.regex.toggled.connect(self.search)
+        self.case_sensitive = QtWidgets.QCheckBox('Case')
+        self.case_sensitive.toggled.connect(self.search)
+        self.button_previous = QtWidgets.QPushButton('Prev')
+        self.button_previous.clicked.connect(lambda: self.find(backward=True))
+        self.button_next = QtWidgets.QPushButton('Next')
+        self.button_next.clicked.connect(lambda: self.find())
+        self.button_filter = QtWidgets.QPushButton('Filter')
+        self.button_filter.setCheckable(True)
+        self.button_filter.toggled.connect(self.show_filter)
+        self.status = QtWidgets.QLabel()
+        for widget in (self.query, self.regex, self.case_sensitive, self.button_previous, self.button_next,
+                       self.button_filter, self.status):
+            controls.addWidget(widget)
+        layout.addLayout(controls)
+
+        # Create Match List, shown by Filter
+        self.model = MatchListModel(self.index, self)
+        self.match_list = QtWidgets.QListView()
+        self.match_list.setModel(self.model)
+        self.match_list.setUniformItemSizes(True)
+        self.match_list.clicked.connect(self.__match_clicked)
+        self.match_list.hide()
+        layout.addWidget(self.match_list)
+
+    # ------------------------------------
+    # Document Sync
+
+    def __contents_change(self, position, removed, added):
+        """
+        Evictions are applied at once, other changes only mark lines from the changed one as dirty;
+        they are copied into the index when it is used, or every SYNC_INTERVAL while the bar is shown
+        """
+        document = self.document
+        if removed and not added and position == 0:
+            # Oldest lines evicted by maximumBlockCount, or console cleared
+            if document.isEmpty():
+                self.index.clear()
+                self._current = None
+                self._dirty = None
+            elif not self.index.remove_head(removed, self._dirty):
+                self._dirty = self.index.first
+            return
+        number = self.index.first + document.findBlock(position).blockNumber()
+        if self._dirty is None or number < self._dirty:
+            self._dirty = number
+        if self.isVisible() and not self._sync_timer.isActive():
+            self._sync_timer.start()
+
+    def sync(self):
+        """
+        Copy dirty lines into the index
+        :return:
+        """
+        if self._dirty is None:
+            return
+        document = self.document
+        block_number = max(self._dirty - self.index.first, 0)
+        self._dirty = None
+        self.__copy_blocks(block_number)
+        if len(self.index) != document.blockCount():
+            self.__copy_blocks(0)
+        if self.match_list.isVisible():
+            self.model.refresh()
+        if self.isVisible():
+            self.__update_status()
+
+    def __copy_blocks(self, block_number):
+        texts = []
+        block = self.document.findBlockByNumber(block_number)
+        while block.isValid():
+            texts.append(block.text())
+            block = block.next()
+        self.index.replace_from(self.index.first + block_number, texts)
+
+    # ------------------------------------
+    # Search
+
+    def open(self):
+        self.show()
+        self.sync()
+        self.query.setFocus()
+        self.query.selectAll()
+
+    def close_bar(self):
+        self.hide()
+        # Typing and output continue at the end of the console
+        cursor = self.console.textCursor()
+        cursor.movePosition(QtGui.QTextCursor.MoveOperation.End)
+        self.console.setTextCursor(cursor)
+        self.console.setFocus()
+
+    def search(self):
+        """
+        Run query and select the most recent match
+        :return:
+        """
+        self._current = None
+        self.sync()
+        try:
+            self.index.search(self.query.text(), self.regex.isChecked(), self.case_sensitive.isChecked())
+        except re.error as e:
+            self.index.search('')
+            self.status.setText('Invalid regex: {}'.format(e))
+            self.model.refresh()
+            return
+        self.model.refresh()
+        if self.index.matches:
+            self.find(backward=True)
+        self.__update_status()
+
+    def find(self, backward=False):
+        """
+        Select the next (or previous) match, after the selected one or the console cursor
+        :param backward:
+        :return: False if nothing matches
+        """
+        self.sync()
+        index = self.index
+        if self._current is not None and self._current[0] >= index.first:
+            number, column = self._current[0], self._current[1]
+        else:
+            cursor = self.console.textCursor()
+            number = index.first + cursor.blockNumber()
+            column = cursor.positionInBlock() - (0 if backward else 1)
+
+        # Next match in the same line, then in the next matching line
+        if backward:
+            spans = [span for span in index.spans(number) if span[0] < column]
+        else:
+            spans = [span for span in index.spans(number) if span[0] > column]
+        if not spans:
+            number = index.next_match(number, backward)
+            if number is None:
+                return False
+            spans = index.spans(number)
+            if not spans:
+                return False
+        self.select(number, *(spans[-1] if backward else spans[0]))
+        return True
+
+    def select(self, number, start, end):
+        block = self.document.findBlockByNumber(number - self.index.first)
+        cursor = QtGui.QTextCursor(block)
+        cursor.setPosition(block.position() + start)
+        cursor.setPosition(block.position() + end, QtGui.QTextCursor.MoveMode.KeepAnchor)
+        self.console.setTextCursor(cursor)
+        self.console.centerCursor()
+        self._current = (number, start, end)
+        self.__update_status()
+
+    def show_filter(self, state=True):
+        self.match_list.setVisible(state)
+        if state:
+            self.sync()
+            self.model.refresh()
+
+    def __update_status(self):
+        matches = self.index.matches
+        if not self.query.text():
+            self.status.clear()
+        elif self._current is None or self._current[0] < self.index.first:
+            self.status.setText('{} lines'.format(len(matches)))
+        else:
+            position = bisect.bisect_left(matches, self._current[0]) + 1
+            self.status.setText('line {} of {}'.format(position, len(matches)))
+
+    def __match_clicked(self, model_index):
+        number = self.model.number(model_index.row())
+        spans = self.index.spans(number)
+        if spans:
+            self.select(number, *spans[0])
+
+    def __query_key_press(self, event):
+        if event.key() in (QtCore.Qt.Key.Key_Return, QtCore.Qt.Key.Key_Enter):
+            self.find(backward=bool(event.modifiers() & QtCore.Qt.KeyboardModifier.ShiftModifier))
+            return
+        if event.key() == QtCore.Qt.Key.Key_Escape:
+            self.close_bar()
+            return
+        QtWidgets.QLineEdit.keyPressEvent(self.query, event)
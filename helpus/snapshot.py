@@ -0,0 +1,554 @@
+import atexit
+import cmd
+import collections.abc
+import itertools
+import json
+import linecache
+import os
+import queue
+import re
+import reprlib
+import struct
+import sys
+import threading
+import time
+import traceback
+import types
+import zlib
+
+# File starts with MAGIC and the size of the compressed header, followed by the header
+# (stack summary, JSON) and one compressed JSON blob of locals per frame
+MAGIC = b'HELPUS-SNAP-1\n'
+SIZE = struct.Struct('<I')
+EXTENSION = '.hsnap'
+
+# Source lines stored around the current line of every frame
+CONTEXT_LINES = 5
+
+
+class SnapshotLimits:
+    """
+    Bounds of one capture: containers are followed max_depth levels deep, with at most max_length
+    items each, reprs are cut at max_string characters and serialization stops after max_bytes
+    """
+    __slots__ = ('max_depth', 'max_length', 'max_string', 'max_bytes', 'max_frames')
+
+    def __init__(self, max_depth=3, max_length=50, max_string=200, max_bytes=256 * 1024, max_frames=30):
+        self.max_depth = max_depth
+        self.max_length = max_length
+        self.max_string = max_string
+        self.max_bytes = max_bytes
+        self.max_frames = max_frames
+
+
+class BoundedRepr(reprlib.Repr):
+    """
+    reprlib.Repr without sorting dicts and sets first, which costs O(n log n) on huge containers.
+    Container types reprlib does not know (defaultdict, OrderedDict, Counter, subclasses) are
+    summarised by their first items when their repr is the builtin one, which would list them all
+    """
+    # Container reprs visiting every item: builtin ones and those of the collections module
+    FULL_REPR_TYPES = (dict, list, tuple, set, frozenset)
+
+    def repr_dict(self, x, level):
+        if not x:
+            return '{}'
+        if level <= 0:
+            return '{...}'
+        pieces = ['{}: {}'.format(self.repr1(key, level - 1), self.repr1(value, level - 1))
+                  for key, value in itertools.islice(x.items(), self.maxdict)]
+        return '{' + ', '.join(pieces) + (', ...' if len(x) > self.maxdict else '') + '}'
+
+    def repr_set(self, x, level):
+        if not x:
+            return repr(x)
+        if level <= 0:
+            return '{...}'
+        pieces = [self.repr1(item, level - 1) for item in itertools.islice(x, self.maxset)]
+        text = '{' + ', '.join(pieces) + (', ...' if len(x) > self.maxset else '') + '}'
+        return text if isinstance(x, set) else 'frozenset({})'.format(text)
+
+    repr_frozenset = repr_set
+
+    def repr_instance(self, x, level):
+        if isinstance(x, (str, bytes, bytearray)) or not isinstance(
+                x, (collections.abc.Mapping, collections.abc.Sequence, collections.abc.Set)):
+            return super().repr_instance(x, level)
+        owner = next(cls for cls in type(x).__mro__ if '__repr__' in vars(cls))
+        if owner not in self.FULL_REPR_TYPES and owner.__module__ != 'collections':
+            # Own repr, trusted to be short (e.g. range, numpy arrays)
+            return super().repr_instance(x, level)
+        if level <= 0:
+            return '{}(...)'.format(type(x).__name__)
+        if isinstance(x, collections.abc.Mapping):
+            pieces = ['{}: {}'.format(self.repr1(key, level - 1), self.repr1(value, level - 1))
+                      for key, value in itertools.islice(x.items(), self.maxdict)]
+            brackets, limit = '{}', self.maxdict
+        else:
+            limit = self.maxset if isinstance(x, collections.abc.Set) else self.maxlist
+            pieces = [self.repr1(item, level - 1) for item in itertools.islice(x, limit)]
+            brackets = '{}' if isinstance(x, collections.abc.Set) else '[]'
+        items = ', '.join(pieces) + (', ...' if len(x) > limit else '')
+        return '{}({}{}{})'.format(type(x).__name__, brackets[0], items, brackets[1])
+
+
+class _Serializer:
+    """
+    Turns values into {'t': type, 'r': repr, 'n': len, 'c': [[name, value], ...], 'more': True} trees
+    """
+    _LEAVES = (str, bytes, bytearray, int, float, complex, bool, type(None))
+    # Shown by repr only, their namespaces are not program state
+    _OPAQUE = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+    def __init__(self, limits):
+        self.limits = limits
+        self.budget = limits.max_bytes
+        self._repr = BoundedRepr()
+        self._repr.maxstring = limits.max_string
+        self._repr.maxother = limits.max_string
+        self._repr.maxlevel = 1
+
+    def short_repr(self, value):
+        try:
+            text = self._repr.repr(value)
+        except Exception as e:
+            text = '<repr failed: {}>'.format(type(e).__name__)
+        self.budget -= len(text)
+        return text
+
+    @staticmethod
+    def _children(value):
+        if isinstance(value, dict):
+            return ((None, key, item) for key, item in value.items())
+        if isinstance(value, (list, tuple, set, frozenset)):
+            return ((str(index), None, item) for index, item in enumerate(value))
+        attributes = getattr(value, '__dict__', None)
+        if isinstance(attributes, dict):
+            return ((name, None, item) for name, item in attributes.items())
+        return None
+
+    def serialize(self, value, depth=0):
+        node = {'t': type(value).__name__, 'r': self.short_repr(value)}
+        if isinstance(value, self._LEAVES + self._OPAQUE) or depth >= self.limits.max_depth or self.budget <= 0:
+            return node
+        try:
+            children = self._children(value)
+            if children is None:
+                return node
+            if hasattr(value, '__len__'):
+                node['n'] = len(value)
+            items = []
+            for name, key, item in children:
+                if len(items) >= self.limits.max_length or self.budget <= 0:
+                    node['more'] = True
+                    break
+                if name is None:
+                    name = self.short_repr(key)
+                items.append([name, self.serialize(item, depth + 1)])
+        except Exception:
+            # Container changed while iterating or broken __len__/__dict__
+            return node
+        node['c'] = items
+        return node
+
+    def serialize_frame(self, frame, lineno):
+        code = frame.f_code
+        start = max(lineno - CONTEXT_LINES, 1)
+        source = [[number, linecache.getline(code.co_filename, number, frame.f_globals).rstrip('\n')]
+                  for number in range(start, lineno + CONTEXT_LINES + 1)]
+        summary = {
+            'filename': code.co_filename,
+            'lineno': lineno,
+            'function': code.co_name,
+            'args': list(code.co_varnames[:code.co_argcount + code.co_kwonlyargcount]),
+            'source': [line for line in source if line[1]],
+        }
+        local_items = []
+        for name, value in frame.f_locals.items():
+            if self.budget <= 0:
+                summary['more'] = True
+                break
+            local_items.append([name, self.serialize(value)])
+        return summary, local_items
+
+
+class SnapshotWriter:
+    """
+    Compresses and writes snapshots in a daemon thread, so the captured program continues as soon
+    as values are serialized. Pending snapshots are written before the process exits
+    """
+    _STOP = object()
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._write_snapshots, name='HelpUs Snapshots', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def put(self, path, header, frame_locals):
+        self._queue.put((path, header, frame_locals))
+
+    def _write_snapshots(self):
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                return
+            try:
+                write_snapshot(*item)
+            except (OSError, TypeError, ValueError):
+                traceback.print_exc(file=sys.__stderr__)
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._queue.put(self._STOP)
+        self._thread.join()
+        self._thread = None
+
+
+_writer = None
+_writer_lock = threading.Lock()
+# Keeps names unique for snapshots taken within the same second
+_sequence = itertools.count()
+
+
+def get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = SnapshotWriter()
+    return _writer
+
+
+def write_snapshot(path, header, frame_locals):
+    """
+    :param path:
+    :param header: stack summary, blob offsets are added here
+    :param frame_locals: list of locals per frame, same order as header['frames']
+    :return:
+    """
+    blobs = []
+    offset = 0
+    for frame, local_items in zip(header['frames'], frame_locals):
+        blob = zlib.compress(json.dumps(local_items).encode('utf-8'), 1)
+        frame['offset'], frame['size'] = offset, len(blob)
+        offset += len(blob)
+        blobs.append(blob)
+    header_data = zlib.compress(json.dumps(header).encode('utf-8'), 1)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as fp_w:
+        fp_w.write(MAGIC)
+        fp_w.write(SIZE.pack(len(header_data)))
+        fp_w.write(header_data)
+        for blob in blobs:
+            fp_w.write(blob)
+    # Readers never see half written snapshots
+    os.replace(temp_path, path)
+
+
+def capture(directory, frame=None, tb=None, exception=None, reason='hook', limits=None):
+    """
+    Serialize stack and locals, writing happens in background
+    :param directory:
+    :param frame: innermost frame, caller of capture by default
+    :param tb: traceback, frames of the traceback are captured instead of frame's stack
+    :param exception: exception instance being handled
+    :param reason:
+    :param limits: SnapshotLimits
+    :return: path snapshot will be written to
+    """
+    start = time.perf_counter()
+    limits = limits or SnapshotLimits()
+    serializer = _Serializer(limits)
+
+    if tb is not None:
+        # Innermost first, like walk_stack. Line is where the exception passed through the frame,
+        # callers of the frame handling it follow
+        frames = list(traceback.walk_tb(tb))[::-1]
+        if tb.tb_frame.f_back is not None:
+            frames += list(traceback.walk_stack(tb.tb_frame.f_back))
+    else:
+        frames = list(traceback.walk_stack(frame or sys._getframe(1)))
+    frames = frames[:limits.max_frames]
+
+    summaries = []
+    frame_locals = []
+    for item, lineno in frames:
+        summary, local_items = serializer.serialize_frame(item, lineno)
+        summaries.append(summary)
+        frame_locals.append(local_items)
+
+    thread = threading.current_thread()
+    header = {
+        'time': time.time(),
+        'pid': os.getpid(),
+        'thread': thread.name,
+        'reason': reason,
+        'exception': ''.join(traceback.format_exception_only(type(exception), exception)).strip()
+        if exception is not None else None,
+        # Outermost first, like pdb's where
+        'frames': summaries[::-1],
+        'truncated': serializer.budget <= 0 or len(frames) == limits.max_frames,
+        'capture_s': time.perf_counter() - start,
+    }
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, '{}-{}-{}-{}{}'.format(
+        time.strftime('%Y%m%d-%H%M%S'), os.getpid(), thread.ident, next(_sequence), EXTENSION
+    ))
+    get_writer().put(path, header, frame_locals[::-1])
+    return path
+
+
+def install_excepthook(directory, limits=None):
+    """
+    Capture a snapshot of every uncaught exception (main and other threads), then run previous hooks
+    :param directory:
+    :param limits:
+    :return:
+    """
+    previous_hook = sys.excepthook
+    previous_thread_hook = threading.excepthook
+
+    def excepthook(exc_type, exc_value, exc_traceback):
+        capture(directory, tb=exc_traceback, exception=exc_value, reason='exception', limits=limits)
+        previous_hook(exc_type, exc_value, exc_traceback)
+
+    def thread_excepthook(args):
+        if args.exc_traceback is not None:
+            capture(directory, tb=args.exc_traceback, exception=args.exc_value, reason='exception', limits=limits)
+        previous_thread_hook(args)
+
+    sys.excepthook = excepthook
+    threading.excepthook = thread_excepthook
+
+
+class Snapshot:
+    """
+    Snapshot file, locals of a frame are decompressed the first time they are asked for
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as fp_r:
+            if fp_r.read(len(MAGIC)) != MAGIC:
+                raise ValueError('Not a HelpUs snapshot: {}'.format(path))
+            size, = SIZE.unpack(fp_r.read(SIZE.size))
+            self.header = json.loads(zlib.decompress(fp_r.read(size)))
+        self._data_offset = len(MAGIC) + SIZE.size + size
+        self._locals = {}
+
+    @property
+    def frames(self):
+        return self.header['frames']
+
+    def frame_locals(self, index):
+        """
+        :param index: frame index, 0 is the outermost frame
+        :return: dict name -> serialized value
+        """
+        if index not in self._locals:
+            frame = self.frames[index]
+            with open(self.path, 'rb') as fp_r:
+                fp_r.seek(self._data_offset + frame['offset'])
+                self._locals[index] = dict(json.loads(zlib.decompress(fp_r.read(frame['size']))))
+        return self._locals[index]
+
+
+# Path into a serialized value: name, .attribute, [key]
+_PATH_TOKEN = re.compile(r'\.(\w+)|\[([^\]]+)\]')
+
+
+def lookup(namespace, expression):
+    """
+    Follow expression such as "self.items[0]['key']" through serialized values
+    :param namespace: dict name -> serialized value
+    :param expression:
+    :return: serialized value
+    """
+    expression = expression.strip()
+    match = re.match(r'\w+', expression)
+    if match is None or match.group() not in namespace:
+        raise KeyError(expression.split('.')[0].split('[')[0])
+    node = namespace[match.group()]
+    position = match.end()
+    while position < len(expression):
+        token = _PATH_TOKEN.match(expression, position)
+        if token is None:
+            raise SyntaxError('Only names, .attributes and [keys] can be looked up in a snapshot')
+        name = (token.group(1) or token.group(2)).strip()
+        for child_name, child in node.get('c', ()):
+            if child_name == name:
+                node = child
+                break
+        else:
+            raise KeyError(name if 'c' in node else '{} (not captured)'.format(name))
+        position = token.end()
+    return node
+
+
+def format_value(node, indent=0, name=None):
+    """
+    :param node: serialized value
+    :param indent:
+    :param name:
+    :return: lines of captured tree, like pprint
+    """
+    prefix = '  ' * indent + ('{}: '.format(name) if name is not None else '')
+    if 'c' not in node:
+        return [prefix + node['r']]
+    size = ' [{}]'.format(node['n']) if 'n' in node else ''
+    lines = ['{}<{}{}>'.format(prefix, node['t'], size)]
+    for child_name, child in node['c']:
+        lines.extend(format_value(child, indent + 1, child_name))
+    if node.get('more'):
+        lines.append('  ' * (indent + 1) + '...')
+    return lines
+
+
+class SnapshotBrowser(cmd.Cmd):
+    """
+    pdb-style commands over a Snapshot: where, up, down, list, args, p, pp, exception, quit
+    """
+    prompt = '(Pdb) '
+
+    def __init__(self, path, stdin=None, stdout=None):
+        super().__init__(stdin=stdin, stdout=stdout)
+        self.use_rawinput = False
+        self.snapshot = Snapshot(path)
+        self.curindex = len(self.snapshot.frames) - 1
+
+    def preloop(self):
+        header = self.snapshot.header
+        self.message('Snapshot of {} (pid {}, thread {}) taken {}, captured in {:.1f} ms{}'.format(
+            header['reason'], header['pid'], header['thread'], time.ctime(header['time']),
+            header['capture_s'] * 1000, ', truncated' if header['truncated'] else ''
+        ))
+        if header['exception']:
+            self.message(header['exception'])
+        self.print_frame(self.curindex)
+
+    def message(self, text):
+        self.stdout.write(text + '\n')
+
+    def error(self, text):
+        self.message('*** ' + text)
+
+    def print_frame(self, index, marker='> '):
+        frame = self.snapshot.frames[index]
+        self.message('{}{}({}){}()'.format(marker, frame['filename'], frame['lineno'], frame['function']))
+        for number, text in frame['source']:
+            if number == frame['lineno']:
+                self.message('-> ' + text.strip())
+
+    def emptyline(self):
+        pass
+
+    def default(self, line):
+        self.error('Unknown command in snapshot: {}'.format(line.split()[0]))
+
+    def do_where(self, arg):
+        """w(here)
+        Print the captured stack, most recent frame at the bottom."""
+        for index in range(len(self.snapshot.frames)):
+            self.print_frame(index, '> ' if index == self.curindex else '  ')
+
+    do_w = do_bt = do_where
+
+    def do_up(self, arg):
+        """u(p)
+        Move to an older frame."""
+        if self.curindex == 0:
+            self.error('Oldest frame')
+            return
+        self.curindex -= 1
+        self.print_frame(self.curindex)
+
+    do_u = do_up
+
+    def do_down(self, arg):
+        """d(own)
+        Move to a newer frame."""
+        if self.curindex == len(self.snapshot.frames) - 1:
+            self.error('Newest frame')
+            return
+        self.curindex += 1
+        self.print_frame(self.curindex)
+
+    do_d = do_down
+
+    def do_list(self, arg):
+        """l(ist)
+        Show source captured around the current line."""
+        frame = self.snapshot.frames[self.curindex]
+        for number, text in frame['source']:
+            marker = '->' if number == frame['lineno'] else '  '
+            self.message('{:4d} {} {}'.format(number, marker, text))
+
+    do_l = do_list
+
+    def do_args(self, arg):
+        """a(rgs)
+        Print the arguments of the current function."""
+        frame_locals = self.snapshot.frame_locals(self.curindex)
+        for name in self.snapshot.frames[self.curindex]['args']:
+            if name in frame_locals:
+                self.message('{} = {}'.format(name, frame_locals[name]['r']))
+
+    do_a = do_args
+
+    def do_p(self, arg):
+        """p expression
+        Print captured repr of a name, attribute or item, e.g. p self.items[0]."""
+        node = self._lookup(arg)
+        if node is not None:
+            self.message(node['r'])
+
+    def do_pp(self, arg):
+        """pp expression
+        Print captured value as a tree, as deep as it was captured."""
+        node = self._lookup(arg)
+        if node is not None:
+            self.message('\n'.join(format_value(node)))
+
+    def do_locals(self, arg):
+        """locals
+        Print captured locals of the current frame."""
+        for name, node in self.snapshot.frame_locals(self.curindex).items():
+            self.message('{} = {}'.format(name, node['r']))
+
+    def do_exception(self, arg):
+        """exception
+        Print the exception the snapshot was taken for."""
+        self.message(self.snapshot.header['exception'] or 'Snapshot was taken by a hook, not an exception')
+
+    def do_quit(self, arg):
+        """q(uit)
+        Close the snapshot."""
+        return True
+
+    do_q = do_exit = do_EOF = do_quit
+
+    def _lookup(self, expression):
+        try:
+            return lookup(self.snapshot.frame_locals(self.curindex), expression)
+        except KeyError as e:
+            self.error('NameError: {} was not captured'.format(e.args[0]))
+        except SyntaxError as e:
+            self.error(str(e))
+        return None
+
+
+def main():
+    from PyQt5 import QtWidgets
+    from .core import MyBreakPoint
+
+    if len(sys.argv) != 2:
+        sys.exit('Usage: python -m helpus.snapshot SNAPSHOT')
+    app = QtWidgets.QApplication(sys.argv)
+    dialog = MyBreakPoint()
+    dialog.open_snapshot(sys.argv[1])
+    app.exec_()
+
+
+if __name__ == '__main__':
+    main()
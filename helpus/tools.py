@@ -0,0 +1,159 @@
+import cProfile
+import collections
+import io
+import pstats
+import sys
+import threading
+import time
+import traceback
+import tracemalloc
+
+DEFAULT_TOP = 15
+# Tool commands start with PREFIX, which neither pdb commands nor Python statements do
+PREFIX = '%'
+# Longest sampling of '%threads', the GUI thread is blocked meanwhile
+MAX_SAMPLING = 500  # ms
+
+
+class PerformanceTools:
+    """
+    In-process profiling helpers used by MyBreakPoint console commands:
+
+        %profile start | %profile stop [N]   cProfile session between breakpoints, top N functions
+        %memory snapshot | %memory diff [N]  tracemalloc snapshots, top N differences of the last two
+        %threads [SAMPLES] [INTERVAL_MS]     stack of every thread, or most sampled frames per thread
+
+    Profiling covers the GUI thread, which is the thread stopped in pdb for single thread apps.
+    """
+    COMMANDS = ('profile', 'memory', 'threads')
+
+    def __init__(self):
+        self.profiler = None
+        self.snapshots = []
+
+    def run(self, command_line):
+        """
+        :param command_line:
+        :return: report text, None if command_line is not a tool command
+        """
+        words = command_line.split()
+        if not words or not words[0].startswith(PREFIX) or words[0][len(PREFIX):] not in self.COMMANDS:
+            return None
+        command, arguments = words[0][len(PREFIX):], words[1:]
+        try:
+            if command == 'profile':
+                return self.__run_profile(arguments)
+            if command == 'memory':
+                return self.__run_memory(arguments)
+            return self.__run_threads(arguments)
+        except ValueError as e:
+            return '*** {}'.format(e)
+
+    def __run_profile(self, arguments):
+        if arguments[:1] == ['start']:
+            return self.start_profile()
+        if arguments[:1] == ['stop']:
+            return self.stop_profile(*[int(argument) for argument in arguments[1:2]])
+        raise ValueError('Usage: %profile start | %profile stop [N]')
+
+    def __run_memory(self, arguments):
+        if arguments[:1] == ['snapshot']:
+            return self.take_snapshot()
+        if arguments[:1] == ['diff']:
+            return self.snapshot_diff(*[int(argument) for argument in arguments[1:2]])
+        raise ValueError('Usage: %memory snapshot | %memory diff [N]')
+
+    def __run_threads(self, arguments):
+        samples = int(arguments[0]) if arguments else 1
+        interval = int(arguments[1]) if len(arguments) > 1 else 10
+        if samples < 1 or interval < 1 or (samples > 1 and samples * interval > MAX_SAMPLING):
+            raise ValueError('Usage: %threads [SAMPLES] [INTERVAL_MS], sampling for {} ms at most'.format(
+                MAX_SAMPLING
+            ))
+        return self.thread_stacks(samples, interval)
+
+    # ------------------------------------
+    # cProfile
+
+    @property
+    def profiling(self):
+        return self.profiler is not None
+
+    def start_profile(self):
+        if self.profiling:
+            return 'Profiler already running'
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+        return 'Profiler started, run "%profile stop" at a later breakpoint'
+
+    def stop_profile(self, top=DEFAULT_TOP):
+        if not self.profiling:
+            return 'Profiler is not running'
+        self.profiler.disable()
+        stream = io.StringIO()
+        stats = pstats.Stats(self.profiler, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+        self.profiler = None
+        return stream.getvalue().strip('\n')
+
+    def toggle_profile(self):
+        return self.stop_profile() if self.profiling else self.start_profile()
+
+    # ------------------------------------
+    # tracemalloc
+
+    def take_snapshot(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.snapshots = []
+        # Keep only the two snapshots needed for a diff
+        self.snapshots = self.snapshots[-1:] + [tracemalloc.take_snapshot()]
+        current, peak = tracemalloc.get_traced_memory()
+        return 'Snapshot {} taken: {:.1f} KiB traced, {:.1f} KiB peak'.format(
+            len(self.snapshots), current / 1024, peak / 1024
+        )
+
+    def snapshot_diff(self, top=DEFAULT_TOP):
+        if len(self.snapshots) < 2:
+            return 'Take two snapshots with "%memory snapshot" first'
+        statistics = self.snapshots[1].compare_to(self.snapshots[0], 'lineno')
+        return '\n'.join(str(statistic) for statistic in statistics[:top]) or 'No differences'
+
+    def snapshot_and_diff(self):
+        report = self.take_snapshot()
+        if len(self.snapshots) == 2:
+            report += '\n' + self.snapshot_diff()
+        return report
+
+    # ------------------------------------
+    # Threads
+
+    @staticmethod
+    def thread_stacks(samples=1, interval=10):
+        """
+        :param samples: 1 prints full stacks, more prints most sampled frames per thread
+        :param interval: milliseconds between samples
+        :return:
+        """
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        this_thread = threading.get_ident()
+        lines = []
+        if samples <= 1:
+            for ident, frame in sys._current_frames().items():
+                if ident == this_thread:
+                    continue
+                lines.append('Thread {} ({}):'.format(names.get(ident, '?'), ident))
+                lines.extend(line.rstrip('\n') for line in traceback.format_stack(frame))
+            return '\n'.join(lines) or 'No other threads'
+
+        counters = collections.defaultdict(collections.Counter)
+        for _ in range(samples):
+            for ident, frame in sys._current_frames().items():
+                if ident != this_thread:
+                    code = frame.f_code
+                    counters[ident]['{}:{} {}'.format(code.co_filename, frame.f_lineno, code.co_name)] += 1
+            time.sleep(interval / 1000)
+        for ident, counter in counters.items():
+            lines.append('Thread {} ({}), {} samples:'.format(names.get(ident, '?'), ident, samples))
+            lines.extend('  {:5d}  {}'.format(count, location) for location, count in counter.most_common(5))
+        return '\n'.join(lines) or 'No other threads'
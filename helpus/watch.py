@@ -0,0 +1,416 @@
+import collections
+import sys
+import time
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+from .inspector import short_repr
+
+# Time spent evaluating watches automatically at each stop, watches left are shown as skipped
+WATCH_BUDGET = 0.2  # s
+# Watches are evaluated in slices, events (e.g. Next pressed again) are handled between them
+WATCH_SLICE = 0.02  # s
+# A watch taking longer is not evaluated automatically any more, until refreshed by hand
+SLOW_WATCH = 0.1  # s
+
+# Result States
+VALUE = 'value'
+ERROR = 'error'
+SKIPPED = 'skipped'
+SLOW = 'slow'
+
+
+class _Interrupted(BaseException):
+    """
+    Raised into a watch expression by its trace function, BaseException so `except Exception` in
+    the evaluated code does not swallow it
+    """
+
+
+def run_interruptible(function, interrupt):
+    """
+    Run function, interrupt() is polled at every Python line, call and return it runs. Time spent
+    in a single call to C code (e.g. sorting a huge list) cannot be interrupted
+    :param function:
+    :param interrupt: callable returning a reason to stop, or None to go on
+    :return: (result of function, None) or (None, reason)
+    """
+    def trace(frame, event, arg):
+        reason = interrupt()
+        if reason is not None:
+            raise _Interrupted(reason)
+        return trace
+
+    previous = sys.gettrace()
+    sys.settrace(trace)
+    try:
+        return function(), None
+    except _Interrupted as e:
+        return None, e.args[0]
+    finally:
+        sys.settrace(previous)
+
+
+class WatchList:
+    """
+    Watch expressions and their results, cached per frame and expression until the debugger stops
+    again. Results of a scope (one per debugged thread) are compared with those of its previous stop
+    """
+
+    def __init__(self):
+        self.expressions = []
+        self.slow = set()
+        self._code = {}
+        # scope -> object identifying the stop results are cached for
+        self._stops = {}
+        # (scope, frame, expression) -> (text, state)
+        self._cache = {}
+        # scope -> {expression: text} at current and at previous stop
+        self._current = collections.defaultdict(dict)
+        self._previous = collections.defaultdict(dict)
+
+    def add(self, expression):
+        """
+        :param expression:
+        :return: False if expression is empty or already watched
+        """
+        expression = expression.strip()
+        if not expression or expression in self.expressions:
+            return False
+        self.expressions.append(expression)
+        return True
+
+    def remove(self, expression):
+        if expression in self.expressions:
+            self.expressions.remove(expression)
+            self.slow.discard(expression)
+            self._code.pop(expression, None)
+
+    def new_stop(self, scope, stop):
+        """
+        Drop results cached for the previous stop of scope
+        :param scope:
+        :param stop: object which changes at every stop, e.g. Pdb.stack
+        :return: True if stop is not the one results are cached for
+        """
+        if self._stops.get(scope) is stop:
+            return False
+        self._stops[scope] = stop
+        for key in [key for key in self._cache if key[0] == scope]:
+            del self._cache[key]
+        if self._current[scope]:
+            self._previous[scope] = self._current.pop(scope)
+        return True
+
+    def forget(self, scope, frame, expressions=None):
+        """
+        Drop cached results of frame, they are evaluated again
+        :param scope:
+        :param frame:
+        :param expressions: all by default
+        :return:
+        """
+        for key in [key for key in self._cache if key[0] == scope and key[1] is frame]:
+            if expressions is None or key[2] in expressions:
+                del self._cache[key]
+
+    def retain(self, scopes):
+        """
+        Drop everything kept for scopes not listed (e.g. threads which ended), with their frames
+        :param scopes:
+        :return:
+        """
+        for scope in [scope for scope in self._stops if scope not in scopes]:
+            del self._stops[scope]
+        for key in [key for key in self._cache if key[0] not in scopes]:
+            del self._cache[key]
+        for results in (self._current, self._previous):
+            for scope in [scope for scope in results if scope not in scopes]:
+                del results[scope]
+
+    def cached(self, scope, frame, expression):
+        return self._cache.get((scope, frame, expression))
+
+    def evaluate(self, scope, frame, frame_locals, expression, interrupt=None):
+        """
+        :param scope:
+        :param frame:
+        :param frame_locals: locals as seen by pdb, frame.f_locals if None
+        :param expression:
+        :param interrupt: see run_interruptible, an interrupted watch is marked slow and not cached
+        :return: (text, state), cached until next stop
+        """
+        key = (scope, frame, expression)
+        result = self._cache.get(key)
+        if result is not None:
+            return result
+
+        start = time.perf_counter()
+        try:
+            code = self._code.get(expression)
+            if code is None:
+                code = self._code[expression] = compile(expression, '<watch>', 'eval')
+            frame_locals = frame.f_locals if frame_locals is None else frame_locals
+            if interrupt is None:
+                value, reason = eval(code, frame.f_globals, frame_locals), None
+            else:
+                value, reason = run_interruptible(lambda: eval(code, frame.f_globals, frame_locals), interrupt)
+            if reason is not None:
+                self.slow.add(expression)
+                return '{} after {:.1f}s, double click to evaluate'.format(
+                    reason, time.perf_counter() - start), SKIPPED
+            result = (short_repr(value), VALUE)
+        except Exception as e:
+            result = ('*** {}: {}'.format(type(e).__name__, e), ERROR)
+        if time.perf_counter() - start > SLOW_WATCH:
+            self.slow.add(expression)
+        else:
+            self.slow.discard(expression)
+
+        self._cache[key] = result
+        self._current[scope][expression] = result[0]
+        return result
+
+    def changed(self, scope, expression, text):
+        """
+        :return: True if text differs from the one of the previous stop
+        """
+        previous = self._previous[scope].get(expression)
+        return previous is not None and previous != text
+
+
+class WatchPanel(QtWidgets.QWidget):
+    """
+    Watch expressions evaluated in the frame pdb stopped in. Evaluation runs in slices of
+    WATCH_SLICE within WATCH_BUDGET per stop and is cancelled as soon as the frame goes away. A
+    watch running longer than a slice lets the GUI handle events from its trace function, so it
+    can be interrupted too
+    """
+    COLUMNS = ['Expression', 'Value']
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.watches = WatchList()
+        # (scope, frame, frame_locals) of the stop being shown, None while running
+        self._target = None
+        self._queue = collections.deque()
+        self._budget_end = None
+        self._slice_end = None
+        # Expression being evaluated, and evaluation run it belongs to: __stop starts a new one
+        self._evaluating = None
+        self._run = 0
+        # expression -> [item, (text, state, changed) shown]
+        self._items = {}
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.__evaluate_slice)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        # Create Watch Table
+        self.table = QtWidgets.QTreeWidget()
+        self.table.setHeaderLabels(self.COLUMNS)
+        self.table.setRootIsDecorated(False)
+        self.table.setUniformRowHeights(True)
+        self.table.itemDoubleClicked.connect(lambda item, column: self.refresh([item.text(0)]))
+        layout.addWidget(self.table)
+
+        # Create Controls
+        controls = QtWidgets.QHBoxLayout()
+        self.expression = QtWidgets.QLineEdit()
+        self.expression.setPlaceholderText('Watch expression')
+        self.expression.keyPressEvent = self.__expression_key_press
+        self.button_refresh = QtWidgets.QPushButton('Refresh')
+        self.button_refresh.clicked.connect(lambda: self.refresh())
+        self.button_cancel = QtWidgets.QPushButton('Cancel')
+        self.button_cancel.clicked.connect(self.cancel)
+        self.button_cancel.setEnabled(False)
+        self.button_remove = QtWidgets.QPushButton('Remove')
+        self.button_remove.clicked.connect(self.__remove_selected)
+        for widget in (self.expression, self.button_refresh, self.button_cancel, self.button_remove):
+            controls.addWidget(widget)
+        layout.addLayout(controls)
+
+    # ------------------------------------
+    # Watches
+
+    def add_watch(self, expression):
+        if not self.watches.add(expression):
+            return
+        expression = expression.strip()
+        self._items[expression] = [QtWidgets.QTreeWidgetItem(self.table, [expression, '']), None]
+        if self._target is not None:
+            self.refresh([expression])
+
+    def remove_watch(self, expression):
+        self.watches.remove(expression)
+        entry = self._items.pop(expression, None)
+        if entry is not None:
+            self.table.takeTopLevelItem(self.table.indexOfTopLevelItem(entry[0]))
+        if expression in self._queue:
+            self._queue.remove(expression)
+
+    def __expression_key_press(self, event):
+        # Accept Enter, the dialog would click its default button otherwise
+        if event.key() in (QtCore.Qt.Key.Key_Return, QtCore.Qt.Key.Key_Enter):
+            self.add_watch(self.expression.text())
+            self.expression.clear()
+            return
+        QtWidgets.QLineEdit.keyPressEvent(self.expression, event)
+
+    def __remove_selected(self):
+        for item in self.table.selectedItems():
+            self.remove_watch(item.text(0))
+
+    # ------------------------------------
+    # Evaluation
+
+    def set_frame(self, scope=None, stop=None, frame=None, frame_locals=None):
+        """
+        Show watches in frame, values are kept on screen while the program runs (frame None)
+        :param scope: debugged thread, values are compared with its previous stop
+        :param stop: object which changes at every stop, e.g. Pdb.stack
+        :param frame:
+        :param frame_locals: locals as seen by pdb
+        :return:
+        """
+        # Program resumed or another frame is shown, values not evaluated yet keep their old text
+        self.__stop()
+        if frame is None:
+            self._target = None
+            return
+        self._target = (scope, frame, frame_locals)
+        self.watches.new_stop(scope, stop)
+        self.__schedule(self.watches.expressions, force=False)
+
+    def refresh(self, expressions=None):
+        """
+        Evaluate expressions (all by default) again, slow ones too, without time budget
+        :param expressions:
+        :return:
+        """
+        if self._target is None:
+            return
+        scope, frame, _ = self._target
+        self.watches.forget(scope, frame, expressions)
+        if expressions is None:
+            self.__stop()
+            expressions = self.watches.expressions
+        else:
+            for expression in expressions:
+                if expression in self._queue:
+                    self._queue.remove(expression)
+        self.__schedule(expressions, force=True)
+
+    def cancel(self):
+        """
+        Stop evaluating, watches not evaluated yet are shown as skipped
+        :return:
+        """
+        for expression in self._queue:
+            self.__show(expression, 'cancelled, double click to evaluate', SKIPPED)
+        self.__stop()
+
+    def __stop(self):
+        self._timer.stop()
+        self._queue.clear()
+        # Interrupts the watch being evaluated, if any
+        self._run += 1
+        self.button_cancel.setEnabled(False)
+
+    def __schedule(self, expressions, force):
+        """
+        Show cached results at once, queue the others; previous values stay shown until replaced
+        :param expressions:
+        :param force: evaluate slow watches and ignore time budget
+        :return:
+        """
+        scope, frame, _ = self._target
+        for expression in expressions:
+            result = self.watches.cached(scope, frame, expression)
+            if result is not None:
+                self.__show(expression, *result)
+            elif expression in self.watches.slow and not force:
+                self.__show(expression, 'slow, double click to evaluate', SLOW)
+            else:
+                self._queue.append(expression)
+        self._budget_end = None if force else time.perf_counter() + WATCH_BUDGET
+        if self._queue:
+            self.button_cancel.setEnabled(True)
+            self._timer.start(0)
+
+    def __evaluate_slice(self):
+        if self._evaluating is not None:
+            # Timer fired while a watch handles events from its trace function
+            return
+        scope, frame, frame_locals = self._target
+        run = self._run
+        self._slice_end = time.perf_counter() + WATCH_SLICE
+        while self._queue:
+            now = time.perf_counter()
+            if self._budget_end is not None and now > self._budget_end:
+                while self._queue:
+                    self.__show(self._queue.popleft(), 'over time budget, double click to evaluate', SKIPPED)
+                break
+            if now > self._slice_end:
+                # Let the GUI handle input, evaluation continues unless the frame changes meanwhile
+                self._timer.start(0)
+                return
+            expression = self._evaluating = self._queue.popleft()
+            try:
+                result = self.watches.evaluate(scope, frame, frame_locals, expression,
+                                               lambda: self.__interrupt(run))
+            finally:
+                self._evaluating = None
+            if run != self._run:
+                # Cancelled, or another frame shown, while the watch handled events
+                if self._target is not None and self._target[1] is frame:
+                    self.__show(expression, *result)
+                return
+            self.__show(expression, *result)
+        self.button_cancel.setEnabled(False)
+
+    def __interrupt(self, run):
+        """
+        Polled while a watch runs
+        :param run: evaluation run of the watch
+        :return: reason to interrupt the watch, None to go on
+        """
+        now = time.perf_counter()
+        if now > self._slice_end:
+            # Handle input (Cancel, Next...) while the watch runs
+            QtCore.QCoreApplication.processEvents()
+            now = time.perf_counter()
+            self._slice_end = now + WATCH_SLICE
+        if run != self._run:
+            return 'cancelled'
+        if self._budget_end is not None and now > self._budget_end:
+            return 'over time budget'
+        return None
+
+    def __show(self, expression, text, state):
+        entry = self._items.get(expression)
+        if entry is None:
+            return
+        changed = state == VALUE and self._target is not None and \
+            self.watches.changed(self._target[0], expression, text)
+        # Item updates repaint the view, skip those which would not change anything
+        if entry[1] == (text, state, changed):
+            return
+        entry[1] = (text, state, changed)
+        item = entry[0]
+        item.setText(1, text)
+        item.setToolTip(1, text)
+        font = item.font(1)
+        font.setBold(changed)
+        item.setFont(1, font)
+        if state == ERROR:
+            item.setForeground(1, QtGui.QBrush(QtCore.Qt.GlobalColor.red))
+        elif changed:
+            item.setForeground(1, QtGui.QBrush(QtCore.Qt.GlobalColor.darkRed))
+        elif state != VALUE:
+            item.setForeground(1, QtGui.QBrush(QtCore.Qt.GlobalColor.gray))
+        else:
+            # Default text colour
+            item.setData(1, QtCore.Qt.ItemDataRole.ForegroundRole, None)